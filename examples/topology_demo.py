@@ -171,26 +171,32 @@ def main():
             print(f"Цель: аттрактор {{{', '.join(str(n) for n in list(attractor.nodes)[:2])}...}}")
             print()
             
-            # Простой поиск пути (BFS)
+            # Простой поиск пути (BFS). Путь хранится цепочкой ссылок
+            # (вершина, предыдущее_звено) и разворачивается в список один раз
             from collections import deque
-            queue = deque([(start, [start])])
+            queue = deque([((start, None), 1)])
             visited = {start}
             found_path = None
             
             while queue:
-                current, path = queue.popleft()
+                link, length = queue.popleft()
+                current = link[0]
                 
                 if current in attractor.nodes:
-                    found_path = path
+                    found_path = []
+                    while link is not None:
+                        found_path.append(link[0])
+                        link = link[1]
+                    found_path.reverse()
                     break
                 
-                if len(path) > 10:  # Ограничение длины
+                if length > 10:  # Ограничение длины
                     continue
                 
                 for neighbor in graph.get_neighbors(current):
                     if neighbor not in visited:
                         visited.add(neighbor)
-                        queue.append((neighbor, path + [neighbor]))
+                        queue.append(((neighbor, link), length + 1))
             
             if found_path:
                 print(f"✓ Найден путь длины {len(found_path) - 1}:")
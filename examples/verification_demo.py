@@ -160,7 +160,8 @@ def demo():
     dictionary = MacroDictionary()
     
     for macro_rule in verified_macros:
-        name = f"M{len(dictionary.macros) + 1}"
+        # Имена макросов односимвольные: String их иначе не примет
+        name = chr(ord('A') + len(dictionary.macros))
         macro = Macro(
             symbol=Symbol(name),
             definition=macro_rule.left,
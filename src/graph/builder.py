@@ -14,6 +14,7 @@
 
 from typing import Set, List, Dict, Tuple
 from dataclasses import dataclass
+from array import array
 import sys
 import os
 
@@ -163,16 +164,20 @@ class GraphBuilder:
         graph = Graph(vertices=set(), edges={})
         visited = set()
         
-        # BFS
-        from collections import deque
-        queue = deque((s, 0) for s in start_strings)
+        # BFS: очередь — два параллельных массива (строки и уровни)
+        # с индексом головы вместо deque кортежей
+        queue_strings: List[String] = list(start_strings)
+        queue_levels = array('i', [0]) * len(queue_strings)
+        head = 0
         
         for s in start_strings:
             visited.add(s)
             graph.add_vertex(s)
         
-        while queue:
-            current, level = queue.popleft()
+        while head < len(queue_strings):
+            current = queue_strings[head]
+            level = queue_levels[head]
+            head += 1
             
             if level >= depth:
                 continue
@@ -185,7 +190,8 @@ class GraphBuilder:
                 if new_string not in visited:
                     visited.add(new_string)
                     graph.add_vertex(new_string)
-                    queue.append((new_string, level + 1))
+                    queue_strings.append(new_string)
+                    queue_levels.append(level + 1)
         
         return graph
 
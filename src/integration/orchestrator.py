@@ -416,10 +416,12 @@ class SpaceLanguageOrchestrator:
             # AC-автомат для поиска перекрытий
             ac = AhoCorasick()
             for rule in self.rules:
-                # AhoCorasick работает со строками, нужно преобразовать
-                ac.add_pattern(str(rule.left))
+                ac.add_pattern(rule.left.data)
             ac.build()
             
+            # Число вхождений левых частей в правую часть каждого правила
+            right_matches = [len(ac.search(rule.right.data)) for rule in self.rules]
+            
             # Поиск пар перекрытий
             for i, r1 in enumerate(self.rules):
                 for j, r2 in enumerate(self.rules):
@@ -427,14 +429,14 @@ class SpaceLanguageOrchestrator:
                         continue
                     
                     # Проверяем перекрытие правых частей с левыми
-                    matches1 = ac.search(str(r1.right))
-                    matches2 = ac.search(str(r2.right))
+                    matches1 = right_matches[i]
+                    matches2 = right_matches[j]
                     
                     if matches1 or matches2:
                         result.overlap_pairs.append((r1, r2))
                         
                         # Критическая пара если перекрываются левые части
-                        if len(matches1) > 0 and len(matches2) > 0:
+                        if matches1 > 0 and matches2 > 0:
                             result.critical_pairs.append((r1, r2))
             
         except Exception as e:
@@ -15,7 +15,10 @@ from typing import List, Dict, Set, Optional, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 import subprocess
+import threading
+import re
 import os
+from collections import deque
 from pathlib import Path
 
 try:
@@ -26,6 +29,49 @@ except ImportError:
     from src.rewriting import String, Symbol, Rule
 
 
+# Число последних строк лога сборки, возвращаемых из build_theory
+_BUILD_LOG_TAIL = 1000
+
+# Маркер завершения сессии в выводе `isabelle build`
+_FINISHED_RE = re.compile(r'^Finished (\S+)')
+
+# Статические блоки теории не зависят от состояния генератора,
+# поэтому собираются один раз при импорте модуля.
+_DATATYPE_BLOCK: str = '\n'.join([
+    # Symbol
+    'datatype symbol = Zero | Pipe',
+    '',
+    # String
+    'type_synonym string = "symbol list"',
+    '',
+    # Rule
+    'datatype rule = Rule string string',
+    '',
+])
+
+_REWRITING_BLOCK: str = '\n'.join([
+    # Поиск вхождений
+    '(* Find all positions where pattern occurs in string *)',
+    'fun find_positions :: "string \<Rightarrow> string \<Rightarrow> nat list" where',
+    '  "find_positions s p = [i. i \<leftarrow> [0..<length s - length p + 1],',
+    '                             take (length p) (drop i s) = p]"',
+    '',
+    # Применение правила
+    '(* Apply rule at position *)',
+    'fun apply_rule :: "string \<Rightarrow> rule \<Rightarrow> nat \<Rightarrow> string" where',
+    '  "apply_rule s (Rule lhs rhs) pos =',
+    '     take pos s @ rhs @ drop (pos + length lhs) s"',
+    '',
+    # Один шаг переписывания
+    '(* One rewriting step *)',
+    'fun rewrite_step :: "rule list \<Rightarrow> string \<Rightarrow> string set" where',
+    '  "rewrite_step rules s =',
+    '     {apply_rule s r pos | r pos. r \<in> set rules \<and>',
+    '                                    pos \<in> set (find_positions s (case r of Rule lhs _ \<Rightarrow> lhs))}"',
+    '',
+])
+
+
 class ProofStrategy(Enum):
     """Стратегия доказательства"""
     AUTO = "auto"           # Автоматическое (auto, blast)
@@ -91,12 +137,14 @@ class IsabelleTheoryGenerator:
     def __init__(self, theory_name: str = "SpaceLanguage"):
         self.theory_name = theory_name
         self.imports = ["Main"]
+        self._imports_set: Set[str] = set(self.imports)
         self.definitions: List[str] = []
         self.theorems: List[TheoremTemplate] = []
     
     def add_import(self, theory: str):
         """Добавить импорт теории"""
-        if theory not in self.imports:
+        if theory not in self._imports_set:
+            self._imports_set.add(theory)
             self.imports.append(theory)
     
     def add_definition(self, name: str, definition: str):
@@ -110,49 +158,11 @@ class IsabelleTheoryGenerator:
     
     def generate_datatype_definitions(self) -> str:
         """Генерировать определения типов данных"""
-        code = []
-        
-        # Symbol
-        code.append('datatype symbol = Zero | Pipe')
-        code.append('')
-        
-        # String
-        code.append('type_synonym string = "symbol list"')
-        code.append('')
-        
-        # Rule
-        code.append('datatype rule = Rule string string')
-        code.append('')
-        
-        return '\n'.join(code)
+        return _DATATYPE_BLOCK
     
     def generate_rewriting_functions(self) -> str:
         """Генерировать функции переписывания"""
-        code = []
-        
-        # Поиск вхождений
-        code.append('(* Find all positions where pattern occurs in string *)')
-        code.append('fun find_positions :: "string \<Rightarrow> string \<Rightarrow> nat list" where')
-        code.append('  "find_positions s p = [i. i \<leftarrow> [0..<length s - length p + 1],')
-        code.append('                             take (length p) (drop i s) = p]"')
-        code.append('')
-        
-        # Применение правила
-        code.append('(* Apply rule at position *)')
-        code.append('fun apply_rule :: "string \<Rightarrow> rule \<Rightarrow> nat \<Rightarrow> string" where')
-        code.append('  "apply_rule s (Rule lhs rhs) pos =')
-        code.append('     take pos s @ rhs @ drop (pos + length lhs) s"')
-        code.append('')
-        
-        # Один шаг переписывания
-        code.append('(* One rewriting step *)')
-        code.append('fun rewrite_step :: "rule list \<Rightarrow> string \<Rightarrow> string set" where')
-        code.append('  "rewrite_step rules s =')
-        code.append('     {apply_rule s r pos | r pos. r \<in> set rules \<and>')
-        code.append('                                    pos \<in> set (find_positions s (case r of Rule lhs _ \<Rightarrow> lhs))}"')
-        code.append('')
-        
-        return '\n'.join(code)
+        return _REWRITING_BLOCK
     
     def generate_confluence_theorems(self) -> List[TheoremTemplate]:
         """Генерировать теоремы о конфлюентности"""
@@ -253,10 +263,12 @@ class IsabelleTheoryGenerator:
         # Завершение
         lines.append('end')
         
-        # Сохранение
+        # Сохранение (атомарно: Isabelle не увидит недописанный файл)
         Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-        with open(output_path, 'w', encoding='utf-8') as f:
+        tmp_path = str(output_path) + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
             f.write('\n'.join(lines))
+        os.replace(tmp_path, output_path)
         
         print(f"✓ Theory file generated: {output_path}")
 
@@ -322,30 +334,53 @@ class IsabelleDockerRunner:
         
         # Создаём ROOT файл для сборки
         root_path = self.workspace / "ROOT"
-        with open(root_path, 'w') as f:
+        tmp_path = str(root_path) + '.tmp'
+        with open(tmp_path, 'w') as f:
             f.write(f'session {theory_name} = Main +\n')
             f.write(f'  theories\n')
             f.write(f'    {theory_name}\n')
+        os.replace(tmp_path, root_path)
         
         print(f"Building theory {theory_name}...")
         print(f"Workspace: {self.workspace}")
         
         try:
-            # Запускаем Docker контейнер
-            result = subprocess.run(
+            # Запускаем Docker контейнер, читая вывод построчно по мере сборки
+            proc = subprocess.Popen(
                 [
                     "docker", "run", "--rm",
                     "-v", f"{self.workspace}:/workspace",
                     self.image,
                     "isabelle", "build", "-d", "/workspace", "-v", theory_name
                 ],
-                capture_output=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
                 text=True,
-                timeout=120  # 2 минуты
+                bufsize=1
             )
             
-            success = result.returncode == 0
-            output = result.stdout + "\n" + result.stderr
+            # Сторожевой таймер: 2 минуты на сборку
+            timer = threading.Timer(120, proc.kill)
+            timer.start()
+            
+            tail: deque = deque(maxlen=_BUILD_LOG_TAIL)
+            try:
+                for line in proc.stdout:
+                    tail.append(line.rstrip('\n'))
+                    match = _FINISHED_RE.match(line)
+                    if match:
+                        print(f"  Finished {match.group(1)}")
+                returncode = proc.wait()
+            finally:
+                timed_out = not timer.is_alive()
+                timer.cancel()
+                proc.stdout.close()
+            
+            if timed_out:
+                return False, "Build timeout (>2 minutes)"
+            
+            success = returncode == 0
+            output = '\n'.join(tail)
             
             if success:
                 print(f"✓ Theory {theory_name} built successfully")
@@ -355,8 +390,6 @@ class IsabelleDockerRunner:
             
             return success, output
             
-        except subprocess.TimeoutExpired:
-            return False, "Build timeout (>2 minutes)"
         except Exception as e:
             return False, f"Error: {str(e)}"
     
@@ -14,7 +14,7 @@
 - Adjunctions
 """
 
-from typing import List, Dict, Set, Callable, Optional, Any, Tuple
+from typing import List, Dict, Set, Callable, Optional, Any, Tuple, Iterable
 from dataclasses import dataclass, field
 from abc import ABC, abstractmethod
 import sys
@@ -42,6 +42,12 @@ class Object:
     data: Any
     category: str
     name: str = ""
+    _hash: int = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # Используем id для хеширования, так как data может быть не хешируемым;
+        # хеш вычисляется один раз при создании
+        object.__setattr__(self, '_hash', hash((id(self.data), self.category, self.name)))
     
     def __str__(self) -> str:
         if self.name:
@@ -49,8 +55,7 @@ class Object:
         return f"Obj({self.category})"
     
     def __hash__(self) -> int:
-        # Используем id для хеширования, так как data может быть не хешируемым
-        return hash((id(self.data), self.category, self.name))
+        return self._hash
 
 
 @dataclass(frozen=True)
@@ -69,6 +74,17 @@ class Morphism:
     target: Object
     function: Callable[[Any], Any]
     name: str = ""
+    _hash: int = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # Функция хешируется по id, чтобы не обходить замыкание
+        object.__setattr__(
+            self, '_hash',
+            hash((self.source, self.target, id(self.function), self.name))
+        )
+    
+    def __hash__(self) -> int:
+        return self._hash
     
     def __call__(self, x: Any) -> Any:
         """Применить морфизм"""
@@ -85,7 +101,7 @@ class Morphism:
         
         (g ∘ f)(x) = g(f(x))
         """
-        if self.target != other.source:
+        if self.target is not other.source and self.target != other.source:
             raise ValueError(f"Cannot compose: {self.target} ≠ {other.source}")
         
         def composed(x):
@@ -134,14 +150,16 @@ class Category:
     
     def identity(self, obj: Object) -> Morphism:
         """Тождественный морфизм id_A: A → A"""
-        if obj not in self._identity_cache:
-            self._identity_cache[obj] = Morphism(
+        identity = self._identity_cache.get(obj)
+        if identity is None:
+            identity = Morphism(
                 source=obj,
                 target=obj,
                 function=lambda x: x,
                 name=f"id_{obj.name}"
             )
-        return self._identity_cache[obj]
+            self._identity_cache[obj] = identity
+        return identity
     
     def __str__(self) -> str:
         return f"Category {self.name}: |Ob| = {len(self.objects)}, |Mor| = {len(self.morphisms)}"
@@ -223,14 +241,16 @@ class RewritingCategory:
     
     def get_object(self, s: String) -> Object:
         """Получить объект для строки"""
-        if s not in self._string_objects:
-            self._string_objects[s] = Object(
+        obj = self._string_objects.get(s)
+        if obj is None:
+            obj = Object(
                 data=s,
                 category="Rewriting",
                 name=str(s)
             )
-            self.category.add_object(self._string_objects[s])
-        return self._string_objects[s]
+            self._string_objects[s] = obj
+            self.category.add_object(obj)
+        return obj
     
     def add_rewriting_step(self, source: String, target: String, rule: Rule):
         """Добавить шаг переписывания как морфизм"""
@@ -257,15 +277,22 @@ class GeometricFunctor(Functor):
     """
     
     def __init__(self, rewriting_cat: Category, geometry_cat: Category, lift):
+        # Образы объектов: каждый объект погружается не более одного раза
+        self._obj_cache: Dict[Object, Object] = {}
+        
         def obj_map(obj: Object) -> Object:
             if not isinstance(obj.data, String):
                 return obj
-            point = lift.embed_string(obj.data)
-            return Object(
-                data=point,
-                category="Geometry",
-                name=f"F({obj.name})"
-            )
+            image = self._obj_cache.get(obj)
+            if image is None:
+                point = lift.embed_string(obj.data)
+                image = Object(
+                    data=point,
+                    category="Geometry",
+                    name=f"F({obj.name})"
+                )
+                self._obj_cache[obj] = image
+            return image
         
         def mor_map(mor: Morphism) -> Morphism:
             # Морфизм между точками
@@ -286,6 +313,16 @@ class GeometricFunctor(Functor):
             morphism_map=mor_map,
             name="GeomLift"
         )
+    
+    def prepopulate(self, objects: Iterable[Object]):
+        """
+        Заранее вычислить образы объектов.
+        
+        Вызывается один раз перед отображением морфизмов, чтобы
+        mor_map не погружал повторно одни и те же источники и цели.
+        """
+        for obj in objects:
+            self.object_map(obj)
 
 
 def demo():
@@ -398,6 +435,8 @@ def demo():
         lift
     )
     
+    geom_functor.prepopulate(rewriting_cat.category.objects)
+    
     print(f"Функтор: {geom_functor}")
     print()
     
@@ -15,7 +15,7 @@
 from typing import List, Tuple, Set, Callable, Optional, Any
 from dataclasses import dataclass, field
 import math
-from collections import defaultdict
+import re
 import sys
 import os
 
@@ -27,16 +27,86 @@ if _parent_dir not in sys.path:
 
 from rewriting import String, Rule
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = NUMPY_AVAILABLE
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+try:
+    from scipy.spatial import cKDTree
+    from scipy.spatial.distance import pdist
+    SCIPY_AVAILABLE = NUMPY_AVAILABLE
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+# Компилируемый бэкенд расстояния Левенштейна (алгоритм Майерса)
+try:
+    from rapidfuzz.distance import Levenshtein as _Levenshtein
+    from rapidfuzz.process import cdist as _cdist
+    _fast_edit_distance = _Levenshtein.distance
+except ImportError:
+    _cdist = None
+    try:
+        import editdistance as _editdistance
+        _fast_edit_distance = _editdistance.eval
+    except ImportError:
+        _fast_edit_distance = None
+
+# Биграммы, используемые как признаки погружения
+_BIGRAMS = ('00', '0|', '|0', '||')
+
+# Максимальные блоки одинаковых символов (для подсчёта биграмм 'aa')
+_RUN_PATTERNS = {ch: re.compile(re.escape(ch) + '+') for ch in '0|'}
+
+# Коды символов для векторизованного edit distance
+_SYMBOL_CODES = {'0': 0, '|': 1}
+
+# Минимальный размер DP таблицы (n·m), начиная с которого
+# диагональная развёртка на NumPy быстрее чистого Python
+_NUMPY_DP_THRESHOLD = 4096
+
 
-@dataclass(frozen=True)
 class Point:
     """
     Точка в геометрическом пространстве.
     
     Представляет строку как точку в метрическом пространстве.
+    Неизменяемая; хранит только координаты и метку (__slots__).
     """
+    __slots__ = ('coordinates', 'label')
+    
     coordinates: Tuple[float, ...]
-    label: Optional[String] = None
+    label: Optional[String]
+    
+    def __init__(self, coordinates: Tuple[float, ...], label: Optional[String] = None):
+        object.__setattr__(self, 'coordinates', coordinates)
+        object.__setattr__(self, 'label', label)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Point is immutable: cannot assign to '{name}'")
+    
+    def __reduce__(self):
+        # copy, deepcopy и pickle восстанавливают точку через конструктор,
+        # а не через __setattr__
+        return (Point, (self.coordinates, self.label))
+    
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not Point:
+            return NotImplemented
+        return self.coordinates == other.coordinates and self.label == other.label
+    
+    def __hash__(self) -> int:
+        return hash((self.coordinates, self.label))
+    
+    def __repr__(self) -> str:
+        return f"Point(coordinates={self.coordinates!r}, label={self.label!r})"
     
     def __str__(self) -> str:
         coords_str = ', '.join(f'{x:.3f}' for x in self.coordinates)
@@ -53,7 +123,7 @@ class Point:
         """Евклидова метрика"""
         if self.dimension != other.dimension:
             raise ValueError("Points must have same dimension")
-        return math.sqrt(sum((a - b)**2 for a, b in zip(self.coordinates, other.coordinates)))
+        return math.dist(self.coordinates, other.coordinates)
 
 
 class MetricSpace:
@@ -81,11 +151,16 @@ class MetricSpace:
         Returns:
             d(s1, s2) ≥ 0
         """
-        key = (s1, s2)
-        if key not in self._cache:
-            self._cache[key] = self._metric(s1, s2)
-            self._cache[(s2, s1)] = self._cache[key]  # Симметрия
-        return self._cache[key]
+        if s1 is s2 or s1 == s2:
+            return 0.0
+        
+        # Симметрия: одна запись на неупорядоченную пару
+        key = (s1, s2) if hash(s1) <= hash(s2) else (s2, s1)
+        dist = self._cache.get(key)
+        if dist is None:
+            dist = self._metric(s1, s2)
+            self._cache[key] = dist
+        return dist
     
     @staticmethod
     def _edit_distance(s1: String, s2: String) -> float:
@@ -94,31 +169,56 @@ class MetricSpace:
         
         Минимальное число операций (вставка/удаление/замена)
         для преобразования s1 в s2.
+        
+        Использует rapidfuzz/editdistance, если установлены,
+        иначе — DP, скомпилированный Numba, на NumPy или чистом Python.
         """
-        n, m = len(s1), len(s2)
+        if _fast_edit_distance is not None:
+            return float(_fast_edit_distance(s1.data, s2.data))
+        
+        a, b = s1.data, s2.data
+        
+        # Общие префикс и суффикс не влияют на расстояние
+        limit = min(len(a), len(b))
+        prefix = 0
+        while prefix < limit and a[prefix] == b[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and a[-1 - suffix] == b[-1 - suffix]:
+            suffix += 1
+        if prefix or suffix:
+            a = a[prefix:len(a) - suffix]
+            b = b[prefix:len(b) - suffix]
+        
+        n, m = len(a), len(b)
+        if n == 0 or m == 0:
+            return float(n + m)
+        
+        if NUMBA_AVAILABLE:
+            return float(_edit_distance_nb(_encode_symbols(a), _encode_symbols(b)))
         
-        # DP таблица
-        dp = [[0] * (m + 1) for _ in range(n + 1)]
+        if NUMPY_AVAILABLE and n * m >= _NUMPY_DP_THRESHOLD:
+            return float(_edit_distance_np(_encode_symbols(a), _encode_symbols(b)))
         
-        # Инициализация
-        for i in range(n + 1):
-            dp[i][0] = i
-        for j in range(m + 1):
-            dp[0][j] = j
+        # Две строки DP таблицы вместо полной (n+1)×(m+1)
+        prev = list(range(m + 1))
+        curr = [0] * (m + 1)
         
-        # Заполнение
         for i in range(1, n + 1):
+            curr[0] = i
+            ai = a[i-1]
             for j in range(1, m + 1):
-                if s1.symbols[i-1] == s2.symbols[j-1]:
-                    dp[i][j] = dp[i-1][j-1]
+                if ai == b[j-1]:
+                    curr[j] = prev[j-1]
                 else:
-                    dp[i][j] = 1 + min(
-                        dp[i-1][j],    # Удаление
-                        dp[i][j-1],    # Вставка
-                        dp[i-1][j-1]   # Замена
+                    curr[j] = 1 + min(
+                        prev[j],       # Удаление
+                        curr[j-1],     # Вставка
+                        prev[j-1]      # Замена
                     )
+            prev, curr = curr, prev
         
-        return float(dp[n][m])
+        return float(prev[m])
     
     def diameter(self, strings: List[String]) -> float:
         """
@@ -127,13 +227,97 @@ class MetricSpace:
         if len(strings) < 2:
             return 0.0
         
-        max_dist = 0.0
-        for i, s1 in enumerate(strings):
-            for s2 in strings[i+1:]:
-                dist = self.distance(s1, s2)
-                max_dist = max(max_dist, dist)
+        return max(max(row) for row in self.distance_matrix(strings))
+    
+    def distance_matrix(self, strings: List[String]) -> List[List[float]]:
+        """
+        Матрица попарных расстояний M[i][j] = d(s_i, s_j).
         
-        return max_dist
+        Вычисляются только элементы i < j, остальное — по симметрии.
+        Для edit distance с rapidfuzz матрица считается одним вызовом
+        cdist на всех ядрах (бэкенд отпускает GIL).
+        """
+        if (_cdist is not None and NUMPY_AVAILABLE
+                and self._metric is MetricSpace._edit_distance):
+            texts = [s.data for s in strings]
+            return _cdist(
+                texts, texts, scorer=_Levenshtein.distance, workers=-1
+            ).astype(np.float64).tolist()
+        
+        k = len(strings)
+        matrix = [[0.0] * k for _ in range(k)]
+        
+        for i in range(k):
+            s1 = strings[i]
+            row = matrix[i]
+            for j in range(i + 1, k):
+                dist = self.distance(s1, strings[j])
+                row[j] = dist
+                matrix[j][i] = dist
+        
+        return matrix
+
+
+def _encode_symbols(text: str) -> 'np.ndarray':
+    """Закодировать символы строки как массив целых кодов."""
+    codes = [_SYMBOL_CODES.setdefault(ch, len(_SYMBOL_CODES)) for ch in text]
+    return np.asarray(codes, dtype=np.int32)
+
+
+def _edit_distance_np(a: 'np.ndarray', b: 'np.ndarray') -> int:
+    """
+    Расстояние Левенштейна с развёрткой по антидиагоналям.
+    
+    Все ячейки антидиагонали i + j = d независимы, поэтому
+    каждая диагональ обновляется одной векторной операцией.
+    """
+    n, m = a.shape[0], b.shape[0]
+    dp = np.empty((n + 1, m + 1), dtype=np.int32)
+    dp[:, 0] = np.arange(n + 1)
+    dp[0, :] = np.arange(m + 1)
+    
+    for d in range(2, n + m + 1):
+        i = np.arange(max(1, d - m), min(n, d - 1) + 1)
+        j = d - i
+        cost = (a[i - 1] != b[j - 1]).astype(np.int32)
+        dp[i, j] = np.minimum(
+            np.minimum(dp[i - 1, j], dp[i, j - 1]) + 1,
+            dp[i - 1, j - 1] + cost
+        )
+    
+    return int(dp[n, m])
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, boundscheck=False)
+    def _edit_distance_nb(a, b):
+        """Вагнер–Фишер с двумя строками таблицы, скомпилированный Numba."""
+        n, m = a.shape[0], b.shape[0]
+        prev = np.arange(m + 1, dtype=np.int32)
+        curr = np.empty(m + 1, dtype=np.int32)
+        for i in range(1, n + 1):
+            curr[0] = i
+            ai = a[i - 1]
+            for j in range(1, m + 1):
+                cost = 0 if ai == b[j - 1] else 1
+                curr[j] = min(prev[j] + 1, curr[j - 1] + 1, prev[j - 1] + cost)
+            prev, curr = curr, prev
+        return prev[m]
+
+
+def _count_bigram(text: str, bigram: str) -> int:
+    """
+    Число (перекрывающихся) вхождений биграммы в строку.
+    
+    str.count считает непересекающиеся вхождения, что совпадает с
+    перекрывающимися для 'ab' при a ≠ b. Для 'aa' в каждом блоке a^k
+    ровно k-1 вхождений, т.е. count(a) минус число блоков.
+    """
+    first, second = bigram
+    if first != second:
+        return text.count(bigram)
+    runs = _RUN_PATTERNS[first].findall(text)
+    return text.count(first) - len(runs)
 
 
 @dataclass
@@ -147,12 +331,22 @@ class Manifold:
     points: List[Point]
     metric_space: MetricSpace
     dimension: int = 0
+    coords: Any = field(default=None, repr=False, compare=False)
+    _tree: Any = field(default=None, init=False, repr=False, compare=False)
     
     def __post_init__(self):
-        """Вычислить размерность"""
+        """Вычислить размерность и матрицу координат"""
         if self.points and self.dimension == 0:
             # Оценка размерности через анализ локальных окрестностей
             self.dimension = self._estimate_dimension()
+        
+        # SoA: координаты всех точек одной матрицей (N, d)
+        if NUMPY_AVAILABLE and self.points and self.coords is None:
+            self.coords = np.asarray(
+                [p.coordinates for p in self.points], dtype=np.float64
+            )
+            if SCIPY_AVAILABLE:
+                self._tree = cKDTree(self.coords)
     
     def _estimate_dimension(self) -> int:
         """
@@ -178,6 +372,19 @@ class Manifold:
         if k == 0:
             return []
         
+        if self._tree is not None:
+            vectors = self._tree_neighbors(point, k)
+            if vectors is not None:
+                return vectors
+        
+        if self.coords is not None:
+            mask = np.fromiter(
+                (p != point for p in self.points), dtype=bool, count=len(self.points)
+            )
+            diffs = self.coords[mask] - np.asarray(point.coordinates, dtype=np.float64)
+            nearest = np.argsort(np.einsum('ij,ij->i', diffs, diffs), kind='stable')[:k]
+            return [tuple(row) for row in diffs[nearest].tolist()]
+        
         neighbors = sorted(
             [p for p in self.points if p != point],
             key=lambda p: point.distance_to(p)
@@ -192,6 +399,30 @@ class Manifold:
         
         return vectors
     
+    def _tree_neighbors(self, point: Point, k: int) -> Optional[List[Tuple[float, ...]]]:
+        """
+        k ближайших соседей через kd-дерево.
+        
+        Запрашивается k+1 точка, чтобы отбросить саму point.
+        Возвращает None, если после отбрасывания осталось меньше k
+        (в многообразии есть дубликаты point).
+        """
+        origin = np.asarray(point.coordinates, dtype=np.float64)
+        _, idx = self._tree.query(origin, k=min(k + 1, len(self.points)))
+        idx = [i for i in np.atleast_1d(idx).tolist() if self.points[i] != point][:k]
+        if len(idx) < k:
+            return None
+        return [tuple(row) for row in (self.coords[idx] - origin).tolist()]
+    
+    def _pairwise_distances(self) -> 'np.ndarray':
+        """Сжатый вектор попарных евклидовых расстояний (i < j)."""
+        if SCIPY_AVAILABLE:
+            return pdist(self.coords)
+        n = len(self.points)
+        diffs = self.coords[:, None, :] - self.coords[None, :, :]
+        upper = np.triu_indices(n, k=1)
+        return np.sqrt(np.einsum('ijk,ijk->ij', diffs, diffs)[upper])
+    
     def curvature(self) -> float:
         """
         Средняя кривизна многообразия.
@@ -200,20 +431,47 @@ class Manifold:
         """
         if len(self.points) < 3:
             return 0.0
+        return self.summary()['curvature']
+    
+    def summary(self) -> dict:
+        """
+        Статистики попарных евклидовых расстояний в ℝⁿ.
         
-        # Простая оценка: дисперсия расстояний
-        distances = []
-        for i, p1 in enumerate(self.points):
-            for p2 in self.points[i+1:]:
-                distances.append(p1.distance_to(p2))
+        Все величины выводятся из одного прохода по парам точек.
+        Это расстояния погружения, а не edit distance между строками
+        (см. MetricSpace.diameter).
         
-        if not distances:
-            return 0.0
+        Returns:
+            Словарь с ключами curvature, diameter_euclid, mean_dist
+        """
+        if len(self.points) < 2:
+            return {'curvature': 0.0, 'diameter_euclid': 0.0, 'mean_dist': 0.0}
+        
+        if self.coords is not None:
+            dists = self._pairwise_distances()
+            mean_dist = float(dists.mean())
+            variance = float(dists.var())
+            diameter = float(dists.max())
+        else:
+            # Простая оценка: дисперсия расстояний
+            distances = []
+            for i, p1 in enumerate(self.points):
+                for p2 in self.points[i+1:]:
+                    distances.append(p1.distance_to(p2))
+            
+            mean_dist = sum(distances) / len(distances)
+            variance = sum((d - mean_dist)**2 for d in distances) / len(distances)
+            diameter = max(distances)
         
-        mean_dist = sum(distances) / len(distances)
-        variance = sum((d - mean_dist)**2 for d in distances) / len(distances)
+        curvature = 0.0
+        if len(self.points) >= 3:
+            curvature = variance / (mean_dist**2 + 1e-10)
         
-        return variance / (mean_dist**2 + 1e-10)
+        return {
+            'curvature': curvature,
+            'diameter_euclid': diameter,
+            'mean_dist': mean_dist
+        }
 
 
 class GeometricLift:
@@ -244,52 +502,32 @@ class GeometricLift:
         - Частоты символов
         - N-граммы
         """
-        if s in self._embedding_cache:
-            return self._embedding_cache[s]
-        
-        # Feature vector
-        features = []
+        point = self._embedding_cache.get(s)
+        if point is not None:
+            return point
         
-        # 1. Длина (нормализованная)
-        features.append(len(s) / 100.0)
+        text = s.data
+        length = len(text)
+        total = length or 1
         
-        # 2. Частоты символов
-        symbol_counts = defaultdict(int)
-        for sym in s.symbols:
-            symbol_counts[sym.value] += 1
-        
-        total = len(s) or 1
-        features.append(symbol_counts.get('0', 0) / total)
-        features.append(symbol_counts.get('|', 0) / total)
+        # 1. Длина (нормализованная), 2. Частоты символов
+        features = [length / 100.0, text.count('0') / total, text.count('|') / total]
         
         # 3. Позиционные features
-        for i in range(min(5, len(s))):
-            if i < len(s):
-                features.append(1.0 if s.symbols[i].value == '0' else 0.0)
-            else:
-                features.append(0.0)
+        features.extend([1.0 if ch == '0' else 0.0 for ch in text[:5]])
         
         # 4. Паттерны (биграммы)
-        if len(s) >= 2:
-            bigrams = [
-                ('0', '0'),
-                ('0', '|'),
-                ('|', '0'),
-                ('|', '|')
-            ]
-            for bg in bigrams:
-                count = sum(1 for i in range(len(s)-1)
-                           if (s.symbols[i].value, s.symbols[i+1].value) == bg)
-                features.append(count / max(1, len(s) - 1))
+        if length >= 2:
+            features.extend([_count_bigram(text, bg) / (length - 1) for bg in _BIGRAMS])
         else:
             features.extend([0.0] * 4)
         
-        # Дополнить до embedding_dim
-        while len(features) < self.embedding_dim:
-            features.append(0.0)
-        
-        # Обрезать если больше
-        features = features[:self.embedding_dim]
+        # Дополнить или обрезать до embedding_dim
+        padding = self.embedding_dim - len(features)
+        if padding > 0:
+            features.extend([0.0] * padding)
+        else:
+            del features[self.embedding_dim:]
         
         point = Point(tuple(features), label=s)
         self._embedding_cache[s] = point
@@ -305,8 +543,28 @@ class GeometricLift:
         Returns:
             Многообразие в ℝⁿ
         """
+        vertices = list(graph.vertices)
+        
+        if NUMPY_AVAILABLE and vertices:
+            # Все вершины одной матрицей признаков
+            coords = self.embed_many(vertices)
+            points = []
+            for v, row in zip(vertices, coords.tolist()):
+                point = self._embedding_cache.get(v)
+                if point is None:
+                    point = Point(tuple(row), label=v)
+                    self._embedding_cache[v] = point
+                points.append(point)
+            
+            return Manifold(
+                points=points,
+                metric_space=self.metric_space,
+                dimension=0,  # Будет вычислена автоматически
+                coords=coords
+            )
+        
         # Погрузить все вершины
-        points = [self.embed_string(v) for v in graph.vertices]
+        points = [self.embed_string(v) for v in vertices]
         
         return Manifold(
             points=points,
@@ -314,6 +572,45 @@ class GeometricLift:
             dimension=0  # Будет вычислена автоматически
         )
     
+    def embed_many(self, strings: List[String]) -> 'np.ndarray':
+        """
+        Пакетное погружение строк: матрица (N, embedding_dim).
+        
+        Строка i совпадает с embed_string(strings[i]).coordinates,
+        но признаки заполняются по столбцам, без объектов Point.
+        Требует NumPy.
+        """
+        texts = [s.data for s in strings]
+        n = len(texts)
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=n)
+        total = np.maximum(lengths, 1)
+        
+        # Длина + 2 частоты + до 5 позиционных + 4 биграммы
+        raw = np.zeros((n, max(self.embedding_dim, 12)), dtype=np.float64)
+        raw[:, 0] = lengths / 100.0
+        raw[:, 1] = np.fromiter((t.count('0') for t in texts), dtype=np.float64, count=n) / total
+        raw[:, 2] = np.fromiter((t.count('|') for t in texts), dtype=np.float64, count=n) / total
+        
+        # Позиционные признаки есть только для первых min(5, len) символов
+        for pos in range(5):
+            has_pos = lengths > pos
+            raw[has_pos, 3 + pos] = [
+                1.0 if t[pos] == '0' else 0.0 for t, ok in zip(texts, has_pos) if ok
+            ]
+        
+        # Биграммы идут сразу за позиционными признаками
+        rows = np.nonzero(lengths >= 2)[0]
+        offset = 3 + np.minimum(lengths[rows], 5)
+        denom = lengths[rows] - 1
+        for col, bg in enumerate(_BIGRAMS):
+            counts = np.fromiter(
+                (_count_bigram(texts[i], bg) for i in rows.tolist()),
+                dtype=np.float64, count=rows.shape[0]
+            )
+            raw[rows, offset + col] = counts / denom
+        
+        return np.ascontiguousarray(raw[:, :self.embedding_dim])
+    
     def compute_geodesic(self, s1: String, s2: String, steps: int = 10) -> List[Point]:
         """
         Геодезическая между двумя строками.
@@ -330,6 +627,13 @@ class GeometricLift:
         p1 = self.embed_string(s1)
         p2 = self.embed_string(s2)
         
+        if NUMPY_AVAILABLE:
+            a = np.asarray(p1.coordinates, dtype=np.float64)
+            b = np.asarray(p2.coordinates, dtype=np.float64)
+            t = (np.arange(steps + 1, dtype=np.float64) / steps)[:, None]
+            rows = ((1 - t) * a + t * b).tolist()
+            return [Point(tuple(row)) for row in rows]
+        
         path = []
         for i in range(steps + 1):
             t = i / steps
@@ -341,27 +645,40 @@ class GeometricLift:
         
         return path
     
-    def analyze_topology(self, manifold: Manifold) -> dict:
+    def analyze_topology(self, manifold: Manifold, string_diameter: bool = False) -> dict:
         """
         Топологический анализ многообразия.
         
+        Args:
+            manifold: Многообразие
+            string_diameter: Также вычислить диаметр в edit distance
+                (ещё O(N²) сравнений строк)
+        
         Returns:
             Словарь с характеристиками:
             - dimension: размерность
-            - diameter: диаметр
+            - diameter_euclid, mean_dist: расстояния в ℝⁿ
+            - diameter: диаметр в edit distance (если string_diameter)
             - curvature: кривизна
             - is_compact: компактность
         """
-        strings = [p.label for p in manifold.points if p.label]
+        summary = manifold.summary()
         
-        return {
+        topology = {
             'dimension': manifold.dimension,
             'num_points': len(manifold.points),
-            'diameter': self.metric_space.diameter(strings) if strings else 0.0,
-            'curvature': manifold.curvature(),
+            'curvature': summary['curvature'],
+            'diameter_euclid': summary['diameter_euclid'],
+            'mean_dist': summary['mean_dist'],
             'is_compact': len(manifold.points) < float('inf'),
             'embedding_dim': self.embedding_dim
         }
+        
+        if string_diameter:
+            strings = [p.label for p in manifold.points if p.label]
+            topology['diameter'] = self.metric_space.diameter(strings) if strings else 0.0
+        
+        return topology
 
 
 def demo():
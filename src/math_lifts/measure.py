@@ -15,7 +15,7 @@
 
 from typing import Dict, Set, List, Callable, Optional, Tuple
 from dataclasses import dataclass
-from collections import defaultdict
+from collections import defaultdict, Counter
 import math
 import sys
 import os
@@ -27,6 +27,13 @@ if _parent_dir not in sys.path:
 
 from rewriting import String, Rule
 
+try:
+    import numpy as np
+    from scipy.sparse import csr_matrix
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
 
 @dataclass
 class Measure:
@@ -57,7 +64,7 @@ class Measure:
             return Probability({})
         
         prob_values = {s: v / total for s, v in self.values.items()}
-        return Probability(prob_values)
+        return Probability.from_normalized(prob_values)
     
     def support(self) -> Set[String]:
         """Носитель меры: {x : μ(x) > 0}"""
@@ -75,9 +82,21 @@ class Probability(Measure):
     
     def __post_init__(self):
         """Проверка нормировки"""
-        total = self.total()
-        if not (0.99 <= total <= 1.01):  # Допуск на округление
-            raise ValueError(f"Not a probability measure: total = {total}")
+        if __debug__ and self.values:
+            total = math.fsum(self.values.values())
+            if not (0.99 <= total <= 1.01):  # Допуск на округление
+                raise ValueError(f"Not a probability measure: total = {total}")
+    
+    @classmethod
+    def from_normalized(cls, values: Dict[String, float]) -> 'Probability':
+        """
+        Создать меру из значений, нормированных по построению.
+        
+        Пропускает проверку нормировки в __post_init__.
+        """
+        prob = cls.__new__(cls)
+        prob.values = values
+        return prob
     
     def entropy(self) -> float:
         """
@@ -85,17 +104,14 @@ class Probability(Measure):
         
         Мера неопределённости распределения.
         """
-        h = 0.0
-        for prob in self.values.values():
-            if prob > 0:
-                h -= prob * math.log2(prob)
-        return h
+        log2 = math.log2
+        return 0.0 - math.fsum(p * log2(p) for p in self.values.values() if p > 0)
     
     def expectation(self, f: Callable[[String], float]) -> float:
         """
         Математическое ожидание: E[f] = Σ f(x) P(x)
         """
-        return sum(f(s) * prob for s, prob in self.values.items())
+        return math.fsum(f(s) * prob for s, prob in self.values.items())
 
 
 class FrequencyMeasure:
@@ -106,7 +122,7 @@ class FrequencyMeasure:
     """
     
     def __init__(self):
-        self.counts: Dict[String, int] = defaultdict(int)
+        self.counts: Counter = Counter()
         self.total_count = 0
     
     def observe(self, s: String):
@@ -116,8 +132,9 @@ class FrequencyMeasure:
     
     def observe_many(self, strings: List[String]):
         """Наблюдать множество строк"""
-        for s in strings:
-            self.observe(s)
+        strings = list(strings)
+        self.counts.update(strings)
+        self.total_count += len(strings)
     
     def get_measure(self) -> Measure:
         """Получить меру"""
@@ -132,7 +149,7 @@ class FrequencyMeasure:
             s: count / self.total_count
             for s, count in self.counts.items()
         }
-        return Probability(prob_values)
+        return Probability.from_normalized(prob_values)
 
 
 class InvariantMeasure:
@@ -162,10 +179,14 @@ class InvariantMeasure:
         
         deviation = 0.0
         checked = 0
+        successors: Dict[String, list] = {}
         
         for s in strings:
             # Применяем все правила
-            applications = engine.all_applications(s)
+            applications = successors.get(s)
+            if applications is None:
+                applications = engine.all_applications(s)
+                successors[s] = applications
             
             if not applications:
                 continue
@@ -197,21 +218,27 @@ class InvariantMeasure:
         
         engine = RewritingEngine(self.rules)
         
+        if SCIPY_AVAILABLE:
+            return self._find_invariant_sparse(engine, strings, iterations, tolerance)
+        
         # Начальное равномерное распределение
         n = len(strings)
         prob = {s: 1.0 / n for s in strings}
         
+        # Переходы не меняются между итерациями
+        successors = {s: engine.all_applications(s) for s in prob}
+        
         for _ in range(iterations):
             new_prob = defaultdict(float)
             
             for s in strings:
                 # Переходы из s
-                applications = engine.all_applications(s)
+                applications = successors[s]
                 
                 if applications:
                     # Равномерное распределение по образам
                     for t, _, _ in applications:
-                        if t in strings:
+                        if t in prob:
                             new_prob[t] += prob[s] / len(applications)
                 else:
                     # Остаёмся в s если нет переходов
@@ -229,7 +256,63 @@ class InvariantMeasure:
         total = sum(prob.values())
         if total > 0:
             prob = {s: v / total for s, v in prob.items()}
-            return Probability(prob)
+            return Probability.from_normalized(prob)
+        
+        return None
+    
+    @staticmethod
+    def _find_invariant_sparse(
+        engine,
+        strings: List[String],
+        iterations: int,
+        tolerance: float
+    ) -> Optional[Probability]:
+        """
+        Power iteration с разреженной матрицей переходов.
+        
+        P[t, s] = 1/|apps(s)| для каждого перехода s → t внутри strings,
+        P[s, s] = 1 для терминальных s. Одна итерация — одно SpMV.
+        """
+        # Пустое множество строк: мера не определена (как в базовой версии)
+        if not strings:
+            return None
+        
+        index: Dict[String, int] = {}
+        for s in strings:
+            index.setdefault(s, len(index))
+        
+        rows, cols, data = [], [], []
+        for s in strings:
+            i = index[s]
+            applications = engine.all_applications(s)
+            if applications:
+                weight = 1.0 / len(applications)
+                for t, _, _ in applications:
+                    j = index.get(t)
+                    if j is not None:
+                        rows.append(j)
+                        cols.append(i)
+                        data.append(weight)
+            else:
+                rows.append(i)
+                cols.append(i)
+                data.append(1.0)
+        
+        size = len(index)
+        transition = csr_matrix((data, (rows, cols)), shape=(size, size))
+        
+        prob = np.full(size, 1.0 / len(strings))
+        for _ in range(iterations):
+            new_prob = transition @ prob
+            diff = np.abs(new_prob - prob).sum()
+            prob = new_prob
+            if diff < tolerance:
+                break
+        
+        total = prob.sum()
+        if total > 0:
+            prob = prob / total
+            return Probability.from_normalized(dict(zip(index, prob.tolist())))
         
         return None
 
@@ -245,6 +328,8 @@ class ErgodricAnalyzer:
     
     def __init__(self, rules: List[Rule]):
         self.rules = rules
+        # Переходы из уже посещённых строк (правила фиксированы)
+        self._successors: Dict[String, List[String]] = {}
     
     def time_average(
         self,
@@ -261,6 +346,8 @@ class ErgodricAnalyzer:
         import random
         
         engine = RewritingEngine(self.rules)
+        successors = self._successors
+        uniform = random.random
         
         total = 0.0
         current = initial
@@ -269,9 +356,12 @@ class ErgodricAnalyzer:
             total += f(current)
             
             # Случайный переход
-            applications = engine.all_applications(current)
-            if applications:
-                current, _, _ = random.choice(applications)
+            targets = successors.get(current)
+            if targets is None:
+                targets = [t for t, _, _ in engine.all_applications(current)]
+                successors[current] = targets
+            if targets:
+                current = targets[int(uniform() * len(targets))]
             else:
                 break
         
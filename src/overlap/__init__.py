@@ -4,12 +4,14 @@ from .ac_automaton import (
     ACNode,
     AhoCorasick,
     Overlap,
-    OverlapDetector
+    OverlapDetector,
+    OverlapIndex
 )
 
 __all__ = [
     'ACNode',
     'AhoCorasick',
     'Overlap',
-    'OverlapDetector'
+    'OverlapDetector',
+    'OverlapIndex'
 ]
@@ -9,10 +9,17 @@ Aho-Corasick автомат для быстрого поиска множест
 Сложность: O(n + m + z), где n - длина текста, m - суммарная длина паттернов, z - число совпадений
 """
 
-from typing import List, Dict, Set, Tuple, Optional
+from typing import List, Dict, Set, Tuple, Optional, Iterator
 from dataclasses import dataclass, field
 from collections import deque
 
+try:
+    import numpy as np
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 try:
     from ..rewriting import String, Rule
 except ImportError:
@@ -23,6 +30,45 @@ except ImportError:
     from src.rewriting import String, Rule
 
 
+# Минимальная длина текста, с которой поиск идёт через Numba
+_NUMBA_MIN_TEXT = 256
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _ac_scan(goto, lane_of_byte, output_offsets, output_ids, text_bytes):
+        """
+        Проход детерминированного автомата по байтам текста.
+        
+        Выходы состояний заданы в CSR-виде: паттерны состояния s —
+        output_ids[output_offsets[s]:output_offsets[s + 1]].
+        Возвращает параллельные массивы (позиция_конца, id_паттерна).
+        """
+        n = text_bytes.shape[0]
+        
+        # Первый проход: число совпадений
+        total = 0
+        state = 0
+        for i in range(n):
+            state = goto[state, lane_of_byte[text_bytes[i]]]
+            total += output_offsets[state + 1] - output_offsets[state]
+        
+        positions = np.empty(total, dtype=np.int64)
+        ids = np.empty(total, dtype=np.int32)
+        
+        # Второй проход: запись совпадений
+        k = 0
+        state = 0
+        for i in range(n):
+            state = goto[state, lane_of_byte[text_bytes[i]]]
+            for j in range(output_offsets[state], output_offsets[state + 1]):
+                positions[k] = i
+                ids[k] = output_ids[j]
+                k += 1
+        
+        return positions, ids
+
+
 @dataclass
 class ACNode:
     """
@@ -65,6 +111,14 @@ class AhoCorasick:
     def __init__(self):
         self.root = ACNode(depth=0)
         self.patterns: List[str] = []
+        
+        # Плоские таблицы детерминированного автомата (заполняются в build)
+        self._alphabet: Dict[str, int] = {}
+        self._goto: List[List[int]] = [[0]]
+        self._byte_lanes: Optional[bytes] = bytes(256)
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+        self._jit_tables: Optional[tuple] = None
     
     def add_pattern(self, pattern: str):
         """
@@ -125,6 +179,133 @@ class AhoCorasick:
                 # Наследуем output от failure link
                 if child.fail.output:
                     child.output.extend(child.fail.output)
+        
+        self._compile()
+    
+    def _compile(self):
+        """
+        Свернуть trie в плоские таблицы.
+        
+        Состояния нумеруются в порядке BFS (корень = 0). Переходы
+        доопределяются по failure links: goto[s][c] = goto[fail[s]][c],
+        если у s нет прямого потомка по c, поэтому поиск не ходит
+        по failure links.
+        
+        Строки такой таблицы полностью заполнены, а колонок всего
+        |алфавит паттернов| + 1, так что double-array (BASE/CHECK) ничего
+        не сжимает: он выгоден для разреженных строк trie, а при плотных
+        вырождается в ту же матрицу с лишней проверкой CHECK на шаге.
+        """
+        alphabet: Dict[str, int] = {}
+        for pattern in self.patterns:
+            for char in pattern:
+                alphabet.setdefault(char, len(alphabet))
+        
+        # Нумерация состояний в порядке BFS
+        nodes = [self.root]
+        state_of = {id(self.root): 0}
+        for node in nodes:
+            for child in node.children.values():
+                state_of[id(child)] = len(nodes)
+                nodes.append(child)
+        
+        goto: List[List[int]] = []
+        fail: List[int] = []
+        output: List[List[str]] = []
+        
+        for node in nodes:
+            # failure link ведёт в более мелкое состояние, его строка уже готова
+            fail_state = state_of[id(node.fail)] if node.fail is not None else 0
+            # Последняя колонка — символы вне алфавита (сброс в корень)
+            row = [0] * (len(alphabet) + 1)
+            for char, lane in alphabet.items():
+                child = node.children.get(char)
+                if child is not None:
+                    row[lane] = state_of[id(child)]
+                elif node is not self.root:
+                    row[lane] = goto[fail_state][lane]
+            goto.append(row)
+            fail.append(fail_state)
+            output.append(list(node.output))
+        
+        self._alphabet = alphabet
+        self._goto = goto
+        
+        # Таблица для bytes.translate: байт ASCII-текста -> колонка goto
+        reset = len(alphabet)
+        self._byte_lanes = None
+        if reset < 256:
+            self._byte_lanes = bytes(alphabet.get(chr(b), reset) for b in range(256))
+        self._fail = fail
+        self._output = output
+        
+        self._jit_tables = None
+        if NUMBA_AVAILABLE and all(len(ch.encode()) == 1 for ch in alphabet):
+            self._jit_tables = self._compile_jit_tables()
+    
+    def _compile_jit_tables(self) -> tuple:
+        """
+        Таблицы автомата в виде массивов NumPy для _ac_scan.
+        
+        Алфавит уже сжат до символов паттернов (для {'0','|'} — две
+        колонки), а типы берутся минимальные: таблица переходов
+        небольшого автомата целиком помещается в L1.
+        """
+        lane_dtype = np.int8 if len(self._alphabet) < 127 else np.int16
+        lane_of_byte = np.full(256, len(self._alphabet), dtype=lane_dtype)
+        for char, lane in self._alphabet.items():
+            lane_of_byte[ord(char)] = lane
+        
+        state_dtype = np.uint16 if len(self._goto) <= 0xFFFF else np.int32
+        goto = np.asarray(self._goto, dtype=state_dtype).reshape(len(self._goto), len(self._alphabet) + 1)
+        
+        # Выходы в CSR: индексы в списке уникальных паттернов
+        pattern_ids: Dict[str, int] = {}
+        output_ids: List[int] = []
+        output_offsets = [0]
+        for patterns in self._output:
+            for pattern in patterns:
+                output_ids.append(pattern_ids.setdefault(pattern, len(pattern_ids)))
+            output_offsets.append(len(output_ids))
+        
+        return (
+            goto,
+            lane_of_byte,
+            np.asarray(output_offsets, dtype=np.int32),
+            np.asarray(output_ids, dtype=np.int32),
+            list(pattern_ids)
+        )
+    
+    def prefix_states(self, pattern: str) -> List[int]:
+        """
+        Состояния на пути паттерна из корня (после build).
+        
+        i-й элемент — состояние для префикса длины i+1. Паттерн
+        должен быть добавлен в автомат.
+        """
+        alphabet = self._alphabet
+        goto = self._goto
+        states = []
+        state = 0
+        for char in pattern:
+            state = goto[state][alphabet[char]]
+            states.append(state)
+        return states
+    
+    def final_state(self, text: str) -> int:
+        """
+        Состояние автомата после чтения text.
+        
+        Соответствует самому длинному суффиксу text,
+        являющемуся префиксом какого-либо паттерна.
+        """
+        alphabet = self._alphabet
+        goto = self._goto
+        reset = len(alphabet)
+        state = 0
+        for char in text:
+            state = goto[state][alphabet.get(char, reset)]
+        return state
     
     def search(self, text: str) -> List[Tuple[int, str]]:
         """
@@ -136,21 +317,36 @@ class AhoCorasick:
         Returns:
             Список (позиция_конца, паттерн)
         """
+        if self._jit_tables is not None and len(text) >= _NUMBA_MIN_TEXT and text.isascii():
+            goto, lane_of_byte, offsets, ids, id_to_pattern = self._jit_tables
+            text_bytes = np.frombuffer(text.encode('ascii'), dtype=np.uint8)
+            positions, pattern_ids = _ac_scan(goto, lane_of_byte, offsets, ids, text_bytes)
+            return [
+                (pos, id_to_pattern[pid])
+                for pos, pid in zip(positions.tolist(), pattern_ids.tolist())
+            ]
+        
         results = []
-        current = self.root
+        goto = self._goto
+        output = self._output
+        state = 0
         
-        for i, char in enumerate(text):
-            # Следуем по failure links, пока не найдём переход
-            while current != self.root and not current.has_child(char):
-                current = current.fail
-            
-            # Делаем переход, если возможно
-            if current.has_child(char):
-                current = current.get_child(char)
+        # Колонки goto для каждой позиции: для ASCII-текста одним
+        # bytes.translate, без односимвольных str на каждом шаге.
+        # Символ вне алфавита паттернов попадает в колонку сброса в корень
+        if self._byte_lanes is not None and text.isascii():
+            lanes = text.encode('ascii').translate(self._byte_lanes)
+        else:
+            alphabet = self._alphabet
+            reset = len(alphabet)
+            lanes = [alphabet.get(char, reset) for char in text]
+        
+        for i, lane in enumerate(lanes):
+            state = goto[state][lane]
             
             # Собираем все совпадения в этой позиции
-            if current.output:
-                for pattern in current.output:
+            if output[state]:
+                for pattern in output[state]:
                     # Позиция конца паттерна
                     results.append((i, pattern))
         
@@ -177,6 +373,42 @@ class AhoCorasick:
         return positions
 
 
+def _prefix_function(s: str) -> List[int]:
+    """Префикс-функция KMP: f[i] — длина наибольшей грани s[:i+1]"""
+    f = [0] * len(s)
+    j = 0
+    for i in range(1, len(s)):
+        ch = s[i]
+        while j and ch != s[j]:
+            j = f[j - 1]
+        if ch == s[j]:
+            j += 1
+        f[i] = j
+    return f
+
+
+def _suffix_prefix_length(s1: str, s2: str) -> int:
+    """
+    Длина наибольшего суффикса s1, являющегося префиксом s2.
+    
+    KMP-проход по s1 с префикс-функцией s2: O(|s1| + |s2|)
+    вместо перебора длин со сравнением срезов.
+    """
+    if not s1 or not s2:
+        return 0
+    
+    f = _prefix_function(s2)
+    m = len(s2)
+    j = 0
+    for ch in s1:
+        # Полное совпадение s2 — откатываемся, чтобы продолжить поиск
+        while j and (j == m or ch != s2[j]):
+            j = f[j - 1]
+        if ch == s2[j]:
+            j += 1
+    return j
+
+
 @dataclass
 class Overlap:
     """
@@ -212,16 +444,15 @@ class OverlapDetector:
         Returns:
             Overlap или None
         """
-        max_overlap = min(len(s1), len(s2))
+        length = _suffix_prefix_length(s1, s2)
         
-        for length in range(max_overlap, 0, -1):
-            if s1[-length:] == s2[:length]:
-                return Overlap(
-                    pattern1=s1,
-                    pattern2=s2,
-                    overlap_length=length,
-                    overlap_string=s1[-length:]
-                )
+        if length:
+            return Overlap(
+                pattern1=s1,
+                pattern2=s2,
+                overlap_length=length,
+                overlap_string=s1[-length:]
+            )
         
         return None
     
@@ -237,16 +468,80 @@ class OverlapDetector:
         Returns:
             Список перекрытий
         """
-        overlaps = []
+        return OverlapDetector.find_all_overlaps_ac(patterns, min_length)
+    
+    @staticmethod
+    def find_all_overlaps_ac(patterns: List[str], min_length: int = 1) -> List[Overlap]:
+        """
+        Найти все перекрытия через AC-автомат над паттернами.
         
-        for i, p1 in enumerate(patterns):
-            for j, p2 in enumerate(patterns):
-                if i != j:  # Не сравниваем паттерн с самим собой
-                    overlap = OverlapDetector.find_suffix_prefix_overlap(p1, p2)
-                    if overlap and overlap.overlap_length >= min_length:
-                        overlaps.append(overlap)
+        Args:
+            patterns: Список паттернов
+            min_length: Минимальная длина перекрытия
+            
+        Returns:
+            Список перекрытий в том же порядке, что и попарный перебор
+        """
+        return list(OverlapDetector.iter_overlaps_ac(patterns, min_length))
+    
+    @staticmethod
+    def iter_overlaps_ac(patterns: List[str], min_length: int = 1) -> Iterator[Overlap]:
+        """
+        Перечислять перекрытия паттернов по одному (через AC-автомат).
+        
+        Состояние автомата после чтения p1 — самый длинный суффикс p1,
+        являющийся префиксом какого-либо паттерна; цепочка failure links
+        из него перечисляет все такие суффиксы по убыванию длины. Первое
+        состояние цепочки, лежащее на пути паттерна p2, даёт максимальное
+        перекрытие суффикса p1 с префиксом p2. Итого O(Σ|p| + z) вместо
+        O(P² · L²) попарных сравнений.
         
-        return overlaps
+        Перекрытия выдаются по мере обхода, поэтому потребитель может
+        остановиться на первом подходящем (см. check_m_locality).
+        
+        Args:
+            patterns: Список паттернов
+            min_length: Минимальная длина перекрытия
+            
+        Yields:
+            Перекрытия в том же порядке, что и попарный перебор
+        """
+        ac = AhoCorasick()
+        for pattern in patterns:
+            ac.add_pattern(pattern)
+        ac.build()
+        
+        # Для каждого состояния: индексы паттернов, чей префикс оно задаёт
+        prefix_of: Dict[int, List[int]] = {}
+        depth: Dict[int, int] = {}
+        for j, pattern in enumerate(patterns):
+            for length, state in enumerate(ac.prefix_states(pattern), 1):
+                prefix_of.setdefault(state, []).append(j)
+                depth[state] = length
+        
+        fail = ac._fail
+        
+        for i, p1 in enumerate(patterns):
+            if not p1:
+                continue
+            
+            best: Dict[int, int] = {}
+            state = ac.final_state(p1)
+            while state != 0:
+                for j in prefix_of.get(state, ()):
+                    if j != i and j not in best:  # Не сравниваем паттерн с самим собой
+                        best[j] = depth[state]
+                state = fail[state]
+            
+            for j in sorted(best):
+                length = best[j]
+                if length >= min_length:
+                    yield Overlap(
+                        pattern1=p1,
+                        pattern2=patterns[j],
+                        overlap_length=length,
+                        overlap_string=p1[-length:]
+                    )
     
     @staticmethod
     def check_m_locality(rules: List[Rule], m: int) -> bool:
@@ -262,14 +557,16 @@ class OverlapDetector:
         Returns:
             True, если правила M-локальны
         """
-        left_parts = [str(rule.left) for rule in rules]
-        overlaps = OverlapDetector.find_all_overlaps(left_parts)
-        
-        for overlap in overlaps:
-            if overlap.overlap_length > m:
-                return False
+        index = OverlapIndex.cached(rules)
+        if index is not None:
+            return not index.overlaps or index.max_overlap <= m
         
-        return True
+        # Индекса ещё нет: останавливаемся на первом перекрытии длиннее m
+        left_parts = [rule.left.data for rule in rules]
+        return all(
+            overlap.overlap_length <= m
+            for overlap in OverlapDetector.iter_overlaps_ac(left_parts)
+        )
     
     @staticmethod
     def get_max_overlap(rules: List[Rule]) -> int:
@@ -282,13 +579,41 @@ class OverlapDetector:
         Returns:
             Максимальная длина перекрытия
         """
-        left_parts = [str(rule.left) for rule in rules]
-        overlaps = OverlapDetector.find_all_overlaps(left_parts)
-        
-        if not overlaps:
-            return 0
-        
-        return max(o.overlap_length for o in overlaps)
+        return OverlapIndex.for_rules(rules).max_overlap
+
+
+class OverlapIndex:
+    """
+    Перекрытия левых частей набора правил, вычисленные один раз.
+    
+    check_m_locality и get_max_overlap для одного набора правил
+    (например, проверка нескольких M подряд) используют общий индекс.
+    """
+    
+    _cache: Dict[Tuple[str, ...], 'OverlapIndex'] = {}
+    _CACHE_LIMIT = 128
+    
+    def __init__(self, left_parts: List[str]):
+        self.left_parts = list(left_parts)
+        self.overlaps = OverlapDetector.find_all_overlaps(self.left_parts)
+        self.max_overlap = max((o.overlap_length for o in self.overlaps), default=0)
+    
+    @classmethod
+    def cached(cls, rules: List[Rule]) -> Optional['OverlapIndex']:
+        """Уже построенный индекс для набора правил или None"""
+        return cls._cache.get(tuple(rule.left.data for rule in rules))
+    
+    @classmethod
+    def for_rules(cls, rules: List[Rule]) -> 'OverlapIndex':
+        """Индекс для набора правил (кешируется по левым частям)"""
+        key = tuple(rule.left.data for rule in rules)
+        index = cls._cache.get(key)
+        if index is None:
+            if len(cls._cache) >= cls._CACHE_LIMIT:
+                cls._cache.clear()
+            index = cls(key)
+            cls._cache[key] = index
+        return index
 
 
 def demo():
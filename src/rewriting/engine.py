@@ -6,6 +6,7 @@
 - bounded_reach — достижимость за D шагов с ограничением ширины W
 - apply_rule — поиск всех позиций применения правила L→R
 - all_applications — все возможные переходы из текущей строки
+- all_applications_batch — то же для списка строк одним проходом
 
 Топологическое пространство:
 - X = A^ℕ (бесконечные последовательности над алфавитом)
@@ -13,16 +14,61 @@
 - Метрика: d(x,y) = 2^(-k), где k = min{i: x_i ≠ y_i}
 """
 
-from typing import Set, List, Tuple, Dict, Optional
+from typing import Set, List, Tuple, Dict, Optional, Iterator, ClassVar
 from dataclasses import dataclass
-from collections import deque
+from bisect import bisect_right
+from weakref import WeakValueDictionary
+
+
+# Число различных левых частей, начиная с которого один проход
+# AC-автомата быстрее, чем str.find по каждому правилу
+_AC_MIN_PATTERNS = 8
+
+# Максимальное число строк в кеше применений движка: при переполнении
+# кеш очищается (движки живут долго, например в кеше Z3Checker)
+_APP_CACHE_LIMIT = 4096
+
+# Таблицы для упаковки строк над {0,|} в биты (String.to_bits)
+_TO_BITS = str.maketrans('|', '1')
+_FROM_BITS = str.maketrans('1', '|')
+
+
+def _load_aho_corasick():
+    """Ленивый импорт AhoCorasick: модуль overlap сам импортирует rewriting"""
+    try:
+        from ..overlap.ac_automaton import AhoCorasick
+    except ImportError:
+        import sys
+        import os
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from overlap.ac_automaton import AhoCorasick
+    return AhoCorasick
 
 
 @dataclass(frozen=True)
 class Symbol:
-    """Символ алфавита (неизменяемый)"""
+    """
+    Символ алфавита (неизменяемый).
+    
+    Экземпляры разделяются: Symbol('0') всегда возвращает один и тот же
+    объект, поэтому символы строк (String.symbols, кодировщики) не
+    создают новых объектов на каждый символ.
+    """
     value: str
     
+    # Кеш экземпляров: значение -> символ
+    _instances: ClassVar[Dict[str, 'Symbol']] = {}
+    
+    def __new__(cls, value: str = None):
+        # Без аргумента — копирование/распаковка (copy, pickle)
+        if value is None:
+            return object.__new__(cls)
+        symbol = cls._instances.get(value)
+        if symbol is None:
+            symbol = object.__new__(cls)
+            cls._instances[value] = symbol
+        return symbol
+    
     def __str__(self) -> str:
         return self.value
     
@@ -32,47 +78,100 @@ class Symbol:
 
 @dataclass(frozen=True)
 class String:
-    """Строка над алфавитом"""
-    symbols: Tuple[Symbol, ...]
+    """
+    Строка над алфавитом.
+    
+    Хранится как одна Python-строка: символы алфавита односимвольные,
+    поэтому поиск, срезы и хеширование выполняются средствами str.
+    Для совместимости конструктор принимает и кортеж Symbol; каждый
+    символ должен быть ровно одним знаком, иначе ValueError.
+    
+    from_str и apply_rule возвращают интернированные экземпляры:
+    пока строка жива, одинаковые данные дают один и тот же объект.
+    """
+    data: str
+    
+    # Пул интернирования: data -> String (слабые ссылки)
+    _pool = WeakValueDictionary()
+    
+    def __post_init__(self):
+        if not isinstance(self.data, str):
+            symbols = tuple(self.data)
+            for s in symbols:
+                if len(s.value) != 1:
+                    raise ValueError(
+                        f"String поддерживает только односимвольные символы, "
+                        f"получен {s.value!r}"
+                    )
+            object.__setattr__(self, 'data', ''.join(s.value for s in symbols))
     
     def __str__(self) -> str:
-        return ''.join(str(s) for s in self.symbols)
+        return self.data
+    
+    @property
+    def symbols(self) -> Tuple[Symbol, ...]:
+        """Кортеж символов (строится по запросу, для совместимости)"""
+        return tuple(Symbol(c) for c in self.data)
     
     def __len__(self) -> int:
-        return len(self.symbols)
+        return len(self.data)
     
     def __hash__(self) -> int:
-        return hash(self.symbols)
+        return hash(self.data)
     
     def __eq__(self, other) -> bool:
+        if self is other:
+            return True
         if not isinstance(other, String):
             return False
-        return self.symbols == other.symbols
+        return self.data == other.data
     
     @staticmethod
     def from_str(s: str) -> 'String':
-        """Создать строку из Python str"""
-        return String(tuple(Symbol(c) for c in s))
+        """Создать строку из Python str (интернированную)"""
+        string = String._pool.get(s)
+        if string is None:
+            string = String(s)
+            String._pool[s] = string
+        return string
     
     def get_blocks(self) -> List[int]:
         """
         Извлекает блоки 0^n из строки.
         Например: "00|000|0" -> [2, 3, 1]
         """
-        blocks = []
-        count = 0
-        for sym in self.symbols:
-            if sym.value == '0':
-                count += 1
-            elif sym.value == '|':
-                if count > 0:
-                    blocks.append(count)
-                    count = 0
-            else:
-                raise ValueError(f"Unexpected symbol: {sym.value}")
-        if count > 0:
-            blocks.append(count)
-        return blocks
+        # Всё, кроме '0' и '|', — ошибка (первый такой символ в сообщении)
+        unexpected = self.data.replace('0', '').replace('|', '')
+        if unexpected:
+            raise ValueError(f"Unexpected symbol: {unexpected[0]}")
+        
+        return [len(block) for block in self.data.split('|') if block]
+    
+    def to_bits(self) -> Tuple[int, bytes]:
+        """
+        Упакованное представление строки над {0,|}: (длина, байты).
+        
+        Один бит на символ ('|' — 1, '0' — 0), старший бит первого байта
+        после выравнивания — первый символ. Для компактного хранения и
+        передачи; сравнение и хеш по-прежнему идут по data (str уже
+        сравнивается в C и кеширует хеш, а интернирование сводит
+        большинство сравнений к проверке идентичности).
+        """
+        unexpected = self.data.replace('0', '').replace('|', '')
+        if unexpected:
+            raise ValueError(f"Unexpected symbol: {unexpected[0]}")
+        
+        length = len(self.data)
+        value = int(self.data.translate(_TO_BITS), 2) if length else 0
+        return length, value.to_bytes((length + 7) // 8, 'big')
+    
+    @staticmethod
+    def from_bits(length: int, packed: bytes) -> 'String':
+        """Обратное к to_bits преобразование (интернированная строка)"""
+        if not length:
+            return String.from_str('')
+        bits = format(int.from_bytes(packed, 'big'), f'0{length}b')
+        return String.from_str(bits.translate(_FROM_BITS))
 
 
 @dataclass(frozen=True)
@@ -101,6 +200,30 @@ class RewritingEngine:
     
     def __init__(self, rules: List[Rule]):
         self.rules = rules
+        
+        # Левая часть -> индексы правил с ней (в порядке self.rules)
+        self._pattern_rules: Dict[str, List[int]] = {}
+        for idx, rule in enumerate(rules):
+            self._pattern_rules.setdefault(rule.left.data, []).append(idx)
+        
+        # Один AC-автомат по всем левым частям (пустые ищутся через find)
+        self._ac = None
+        patterns = [p for p in self._pattern_rules if p]
+        if len(patterns) >= _AC_MIN_PATTERNS:
+            self._ac = _load_aho_corasick()()
+            for pattern in patterns:
+                self._ac.add_pattern(pattern)
+            self._ac.build()
+            
+            # Разделитель строк фронта при пакетном сканировании
+            used = set(''.join(patterns))
+            separator = '\x00'
+            while separator in used:
+                separator = chr(ord(separator) + 1)
+            self._separator = separator
+        
+        # Кеш применений: строка -> ((новая_строка, индекс_правила, позиция), ...)
+        self._app_cache: Dict[String, Tuple[Tuple[String, int, int], ...]] = {}
     
     def find_positions(self, string: String, pattern: String) -> List[int]:
         """
@@ -113,13 +236,15 @@ class RewritingEngine:
         Returns:
             Список позиций (индексов начала)
         """
+        text = string.data
+        pat = pattern.data
         positions = []
-        n = len(string)
-        m = len(pattern)
         
-        for i in range(n - m + 1):
-            if string.symbols[i:i+m] == pattern.symbols:
-                positions.append(i)
+        # Перекрывающиеся вхождения: следующий поиск с позиции i + 1
+        i = text.find(pat)
+        while i != -1:
+            positions.append(i)
+            i = text.find(pat, i + 1)
         
         return positions
     
@@ -135,33 +260,123 @@ class RewritingEngine:
         Returns:
             Новая строка после применения правила
         """
-        left_len = len(rule.left)
-        new_symbols = (
-            string.symbols[:position] +
-            rule.right.symbols +
-            string.symbols[position + left_len:]
-        )
-        return String(new_symbols)
+        data = string.data
+        return String.from_str(data[:position] + rule.right.data + data[position + len(rule.left):])
     
     def all_applications(self, string: String) -> List[Tuple[String, Rule, int]]:
         """
         Найти все возможные применения правил к строке.
         
+        Результаты кешируются по строке: повторные запросы (другие
+        вызовы bounded_reach/reachable) не сканируют её заново.
+        
         Args:
             string: Исходная строка
             
         Returns:
             Список (новая_строка, правило, позиция)
         """
-        results = []
+        cache = self._app_cache
+        cached = cache.get(string)
+        if cached is None:
+            if len(cache) >= _APP_CACHE_LIMIT:
+                cache.clear()
+            cached = self._scan_applications(string)
+            cache[string] = cached
+        
+        rules = self.rules
+        return [(new_string, rules[idx], pos) for new_string, idx, pos in cached]
+    
+    def all_applications_batch(self, strings: List[String]) -> List[List[Tuple[String, Rule, int]]]:
+        """
+        all_applications для списка строк (например, фронта BFS).
         
-        for rule in self.rules:
-            positions = self.find_positions(string, rule.left)
-            for pos in positions:
-                new_string = self.apply_rule(string, rule, pos)
-                results.append((new_string, rule, pos))
+        Ещё не просканированные строки проходятся AC-автоматом одним
+        пакетом (см. _applications_batch).
         
-        return results
+        Returns:
+            Для каждой строки — список (новая_строка, правило, позиция)
+        """
+        rules = self.rules
+        return [
+            [(new_string, rules[idx], pos) for new_string, idx, pos in cached]
+            for cached in self._applications_batch(strings)
+        ]
+    
+    def _scan_applications(self, string: String) -> Tuple[Tuple[String, int, int], ...]:
+        """Все применения в виде (новая_строка, индекс_правила, позиция)"""
+        if self._ac is None:
+            return tuple(
+                (self.apply_rule(string, rule, pos), idx, pos)
+                for idx, rule in enumerate(self.rules)
+                for pos in self.find_positions(string, rule.left)
+            )
+        
+        return self._expand_matches(string, self._ac.search(string.data))
+    
+    def _expand_matches(
+        self,
+        string: String,
+        matches: List[Tuple[int, str]]
+    ) -> Tuple[Tuple[String, int, int], ...]:
+        """Применения по совпадениям AC-автомата (позиция_конца, левая_часть)"""
+        # Позиции раскладываются по правилам, чтобы сохранить
+        # порядок «по правилам, затем по позициям»
+        rules = self.rules
+        pattern_rules = self._pattern_rules
+        positions: List[List[int]] = [[] for _ in rules]
+        
+        for end_pos, pattern in matches:
+            start = end_pos - len(pattern) + 1
+            for idx in pattern_rules[pattern]:
+                positions[idx].append(start)
+        
+        for idx in pattern_rules.get('', ()):
+            positions[idx] = self.find_positions(string, rules[idx].left)
+        
+        return tuple(
+            (self.apply_rule(string, rules[idx], pos), idx, pos)
+            for idx in range(len(rules))
+            for pos in positions[idx]
+        )
+    
+    def _applications_batch(self, strings: List[String]) -> List[Tuple[Tuple[String, int, int], ...]]:
+        """
+        Применения для списка строк (фронт BFS).
+        
+        Ещё не просканированные строки склеиваются через символ вне
+        алфавита левых частей и проходятся автоматом один раз: на этом
+        символе автомат сбрасывается в корень, поэтому совпадения не
+        пересекают границы строк.
+        """
+        cache = self._app_cache
+        missing = [string for string in strings if string not in cache]
+        
+        # Очистка до заполнения: ниже результаты берутся из кеша
+        if missing and len(cache) + len(missing) > _APP_CACHE_LIMIT:
+            cache.clear()
+            missing = list(dict.fromkeys(strings))
+        
+        if self._ac is None or len(missing) < 2:
+            for string in missing:
+                cache[string] = self._scan_applications(string)
+        else:
+            offsets = []
+            total = 0
+            for string in missing:
+                offsets.append(total)
+                total += len(string) + 1
+            
+            text = self._separator.join(string.data for string in missing)
+            matches_of: List[List[Tuple[int, str]]] = [[] for _ in missing]
+            for end_pos, pattern in self._ac.search(text):
+                k = bisect_right(offsets, end_pos) - 1
+                matches_of[k].append((end_pos - offsets[k], pattern))
+            
+            for string, matches in zip(missing, matches_of):
+                cache[string] = self._expand_matches(string, matches)
+        
+        return [cache[string] for string in strings]
     
     def bounded_reach(
         self,
@@ -185,40 +400,65 @@ class RewritingEngine:
             Словарь {уровень: множество_строк}
         """
         # Результат: уровень -> множество строк
-        levels: Dict[int, Set[String]] = {0: {start}}
+        levels: Dict[int, Set[String]] = {}
+        
+        for level, string in self.iter_reach(start, depth, width):
+            if level not in levels:
+                levels[level] = set()
+            levels[level].add(string)
+        
+        return levels
+    
+    def iter_reach(
+        self,
+        start: String,
+        depth: int,
+        width: Optional[int] = None
+    ) -> Iterator[Tuple[int, String]]:
+        """
+        Потоковый вариант bounded_reach: пары (уровень, строка).
+        
+        Каждая строка выдаётся один раз, при первом обнаружении;
+        уровни не накапливаются, поэтому подсчёт по уровням или поиск
+        нужной строки не держит в памяти множества всех уровней.
+        """
+        for level, string, _ in self._reach_edges(start, depth, width):
+            yield level, string
+    
+    def _reach_edges(
+        self,
+        start: String,
+        depth: int,
+        width: Optional[int]
+    ) -> Iterator[Tuple[int, String, Optional[String]]]:
+        """BFS до глубины depth: (уровень, строка, родитель) для каждой новой строки"""
+        yield 0, start, None
         
         # Все посещённые строки (для избежания циклов)
         visited: Set[String] = {start}
         
-        # BFS
-        queue = deque([(start, 0)])
+        # BFS по уровням: фронт уровня сканируется одним пакетом
+        frontier = [start]
         
-        while queue:
-            current, level = queue.popleft()
+        for level in range(depth):
+            if not frontier:
+                break
             
-            if level >= depth:
-                continue
+            next_frontier = []
             
-            # Все возможные применения правил
-            applications = self.all_applications(current)
-            
-            # Ограничение ширины (если указано)
-            if width is not None and len(applications) > width:
-                # Берём первые W применений (можно сделать случайную выборку)
-                applications = applications[:width]
+            for current, applications in zip(frontier, self._applications_batch(frontier)):
+                # Ограничение ширины (если указано)
+                if width is not None and len(applications) > width:
+                    # Берём первые W применений (можно сделать случайную выборку)
+                    applications = applications[:width]
+                
+                for new_string, _, _ in applications:
+                    if new_string not in visited:
+                        visited.add(new_string)
+                        yield level + 1, new_string, current
+                        next_frontier.append(new_string)
             
-            for new_string, rule, pos in applications:
-                if new_string not in visited:
-                    visited.add(new_string)
-                    
-                    next_level = level + 1
-                    if next_level not in levels:
-                        levels[next_level] = set()
-                    
-                    levels[next_level].add(new_string)
-                    queue.append((new_string, next_level))
-        
-        return levels
+            frontier = next_frontier
     
     def reachable(
         self,
@@ -242,27 +482,20 @@ class RewritingEngine:
         if start == target:
             return [start]
         
-        # BFS с отслеживанием путей
-        queue = deque([(start, [start], 0)])
-        visited: Set[String] = {start}
+        # Родительские ссылки: путь восстанавливается только при успехе
+        parent: Dict[String, Optional[String]] = {}
         
-        while queue:
-            current, path, level = queue.popleft()
+        for _, new_string, prev in self._reach_edges(start, depth, width):
+            parent[new_string] = prev
             
-            if level >= depth:
-                continue
-            
-            applications = self.all_applications(current)
-            if width is not None and len(applications) > width:
-                applications = applications[:width]
-            
-            for new_string, rule, pos in applications:
-                if new_string == target:
-                    return path + [new_string]
-                
-                if new_string not in visited:
-                    visited.add(new_string)
-                    queue.append((new_string, path + [new_string], level + 1))
+            if new_string == target:
+                path = []
+                node = new_string
+                while node is not None:
+                    path.append(node)
+                    node = parent[node]
+                path.reverse()
+                return path
         
         return None
     
@@ -286,9 +519,12 @@ class RewritingEngine:
             Множество строк в ω-пределе
         """
         visited = []
+        # Строка -> индекс первого появления в траектории
+        positions: Dict[String, int] = {}
         current = start
         
         for step in range(max_steps):
+            positions[current] = step
             visited.append(current)
             
             # Применяем первое доступное правило (детерминизация для ω-limit)
@@ -301,8 +537,8 @@ class RewritingEngine:
             current, _, _ = applications[0]
             
             # Проверяем цикл
-            if current in visited:
-                cycle_start = visited.index(current)
+            cycle_start = positions.get(current)
+            if cycle_start is not None:
                 return set(visited[cycle_start:])
         
         # Не нашли цикл за max_steps
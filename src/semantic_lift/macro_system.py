@@ -16,20 +16,68 @@
 from typing import List, Dict, Set, Tuple, Optional
 from dataclasses import dataclass, field
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import heapq
 import json
+import os
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 try:
     from ..rewriting import String, Rule, Symbol, RewritingEngine
     from ..graph import SCC, Graph
+    from ..overlap import OverlapDetector
 except ImportError:
     import sys
-    import os
     sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
     from src.rewriting import String, Rule, Symbol, RewritingEngine
     from src.graph import SCC, Graph
+    from src.overlap import OverlapDetector
 
 
-@dataclass
+def _orjson_default(obj):
+    """Приведение скаляров numpy (и им подобных) для orjson"""
+    if hasattr(obj, 'item'):
+        return obj.item()
+    raise TypeError
+
+
+# Максимальное число множеств достижимости в кешах проверок
+# (LocalConfluenceChecker, BoundedBisimulation); при переполнении кеш
+# очищается целиком
+_REACH_CACHE_LIMIT = 4096
+
+
+def _rules_key(rules: List[Rule]) -> Tuple[Tuple[str, str], ...]:
+    """
+    Отпечаток набора правил для кешей достижимости.
+    
+    Порядок правил сохраняется: при ограничении ширины он влияет на то,
+    какие строки попадут в уровень.
+    """
+    return tuple((rule.left.data, rule.right.data) for rule in rules)
+
+
+# Суммарная длина узлов SCC, начиная с которой частоты подстрок
+# считаются через NumPy (на малых SCC быстрее Counter)
+_NUMPY_MIN_CHARS = 1000
+
+# Суммарная длина, начиная с которой группировка окон разных длин
+# идёт в потоках (сортировка NumPy отпускает GIL)
+_PARALLEL_MIN_CHARS = 100_000
+
+
+@dataclass(slots=True)
 class PatternCandidate:
     """
     Кандидат на подъём в макрос.
@@ -49,7 +97,7 @@ class PatternCandidate:
         return f"'{self.pattern}' (freq={self.frequency}, stab={self.stability:.2f}, score={self.score:.2f})"
 
 
-@dataclass
+@dataclass(slots=True)
 class Macro:
     """
     Макрос: новый символ с определением и метаданными.
@@ -67,12 +115,38 @@ class Macro:
     verified: bool = False
     metadata: Dict = field(default_factory=dict)
     
+    # Готовая JSON-запись для save_to_file
+    _json_fragment: Optional[Dict] = field(default=None, init=False, repr=False, compare=False)
+    
+    def json_fragment(self) -> Dict:
+        """
+        Запись макроса для сохранения словаря.
+        
+        Строится один раз и пересобирается, если после этого изменились
+        symbol, definition, verified или metadata (metadata хранится
+        по ссылке).
+        """
+        fragment = self._json_fragment
+        if (fragment is None
+                or fragment['symbol'] != self.symbol.value
+                or fragment['definition'] != str(self.definition)
+                or fragment['verified'] != self.verified
+                or fragment['metadata'] is not self.metadata):
+            fragment = {
+                'symbol': self.symbol.value,
+                'definition': str(self.definition),
+                'verified': self.verified,
+                'metadata': self.metadata
+            }
+            self._json_fragment = fragment
+        return fragment
+    
     def __str__(self) -> str:
         verified_mark = "✓" if self.verified else "?"
         return f"{self.symbol} := {self.definition} {verified_mark}"
 
 
-@dataclass
+@dataclass(slots=True)
 class MacroDictionary:
     """
     Словарь макросов с версионированием.
@@ -83,9 +157,23 @@ class MacroDictionary:
     version: int = 1
     history: List[Dict] = field(default_factory=list)
     
+    # Индекс символ -> макрос (при повторе символа — первый добавленный)
+    _by_symbol: Dict[Symbol, Macro] = field(default_factory=dict, init=False, repr=False, compare=False)
+    # Таблица str.translate для expand (None — есть многосимвольные
+    # символы); строится при первом expand, сбрасывается в add_macro
+    _expansion_table: Optional[Dict[int, str]] = field(default=None, init=False, repr=False, compare=False)
+    _expansion_ready: bool = field(default=False, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        for macro in self.macros:
+            self._by_symbol.setdefault(macro.symbol, macro)
+    
     def add_macro(self, macro: Macro):
         """Добавить макрос"""
         self.macros.append(macro)
+        self._by_symbol.setdefault(macro.symbol, macro)
+        self._expansion_ready = False
+        macro.json_fragment()
         self.version += 1
         
         self.history.append({
@@ -97,10 +185,7 @@ class MacroDictionary:
     
     def get_macro(self, symbol: Symbol) -> Optional[Macro]:
         """Получить макрос по символу"""
-        for macro in self.macros:
-            if macro.symbol == symbol:
-                return macro
-        return None
+        return self._by_symbol.get(symbol)
     
     def expand(self, string: String) -> String:
         """
@@ -112,48 +197,78 @@ class MacroDictionary:
         Returns:
             Строка без макросов (только базовые символы)
         """
-        current = string
-        changed = True
-        
-        # Итеративное разворачивание
+        data = string.data
         max_iterations = 100
-        iteration = 0
         
-        while changed and iteration < max_iterations:
+        # Символы односимвольные: одна итерация — один проход str.translate
+        # по строке с таблицей символ -> определение из индекса, выход на
+        # первой итерации без изменений
+        table = self._translate_table()
+        if table is not None:
+            for _ in range(max_iterations):
+                expanded = data.translate(table)
+                if expanded == data:
+                    break
+                data = expanded
+            return String.from_str(data)
+        
+        # Многосимвольные имена макросов: замена каждого символа на
+        # определение через str.replace до неподвижной точки
+        for _ in range(max_iterations):
             changed = False
-            iteration += 1
             
             for macro in self.macros:
-                # Заменяем все вхождения символа макроса на определение
-                new_symbols = []
-                
-                for sym in current.symbols:
-                    if sym == macro.symbol:
-                        new_symbols.extend(macro.definition.symbols)
-                        changed = True
-                    else:
-                        new_symbols.append(sym)
-                
-                current = String(tuple(new_symbols))
-        
-        return current
+                symbol = macro.symbol.value
+                if symbol and symbol in data:
+                    data = data.replace(symbol, macro.definition.data)
+                    changed = True
+            
+            if not changed:
+                break
+        
+        return String.from_str(data)
+    
+    def _translate_table(self) -> Optional[Dict[int, str]]:
+        """Таблица код символа -> определение (кешируется до add_macro)"""
+        if not self._expansion_ready:
+            if all(len(symbol.value) <= 1 for symbol in self._by_symbol):
+                self._expansion_table = {
+                    ord(symbol.value): macro.definition.data
+                    for symbol, macro in self._by_symbol.items()
+                    if symbol.value
+                }
+            else:
+                self._expansion_table = None
+            self._expansion_ready = True
+        return self._expansion_table
     
     def save_to_file(self, filename: str):
         """Сохранить словарь в файл"""
         data = {
             'version': self.version,
-            'macros': [
-                {
-                    'symbol': m.symbol.value,
-                    'definition': str(m.definition),
-                    'verified': m.verified,
-                    'metadata': m.metadata
-                }
-                for m in self.macros
-            ],
+            'macros': [m.json_fragment() for m in self.macros],
             'history': self.history
         }
         
+        if ORJSON_AVAILABLE:
+            # orjson пишет UTF-8 без \u-экранирования и NaN/inf как null
+            # (json пишет NaN); скаляры numpy приводятся к числам Python.
+            # Если orjson не справился, сохраняем через json
+            try:
+                payload = orjson.dumps(
+                    data,
+                    default=_orjson_default,
+                    option=(orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+                            | orjson.OPT_SERIALIZE_NUMPY)
+                )
+            except orjson.JSONEncodeError:
+                payload = None
+            
+            if payload is not None:
+                with open(filename, 'wb') as f:
+                    f.write(payload)
+                return
+        
         with open(filename, 'w') as f:
             json.dump(data, f, indent=2)
 
@@ -172,13 +287,18 @@ class FrequencyAnalyzer:
         
         for length in range(min_len, max_len + 1):
             for i in range(len(string) - length + 1):
-                substring = String(string.symbols[i:i+length])
+                substring = String.from_str(string.data[i:i+length])
                 substrings.append(substring)
         
         return substrings
     
     @staticmethod
-    def analyze_scc(scc: SCC, min_len: int = 2, max_len: int = 4) -> List[PatternCandidate]:
+    def analyze_scc(
+        scc: SCC,
+        min_len: int = 2,
+        max_len: int = 4,
+        top_k: Optional[int] = 50
+    ) -> List[PatternCandidate]:
         """
         Анализировать частоты в SCC.
         
@@ -186,29 +306,23 @@ class FrequencyAnalyzer:
             scc: Сильно связная компонента
             min_len: Минимальная длина паттерна
             max_len: Максимальная длина паттерна
+            top_k: Сколько лучших кандидатов вернуть (None = все)
             
         Returns:
             Список кандидатов, отсортированный по score
         """
-        # Собираем все подстроки
-        all_substrings = []
-        
-        for node in scc.nodes:
-            substrings = FrequencyAnalyzer.extract_substrings(node, min_len, max_len)
-            all_substrings.extend(substrings)
-        
-        # Считаем частоты
-        counter = Counter(all_substrings)
+        # Частоты и число содержащих узлов собираются за один проход
+        # по окнам: узел содержит паттерн длины L ⇔ паттерн есть среди
+        # его окон длины L. String создаётся только для прошедших порог
+        frequent = FrequencyAnalyzer._frequent_substrings(list(scc.nodes), min_len, max_len)
         
         # Создаём кандидатов
         candidates = []
         
-        for pattern, frequency in counter.items():
-            if frequency < 2:  # Минимальная частота
-                continue
+        for text, frequency, containing_nodes in frequent:
+            pattern = String.from_str(text)
             
             # Stability: сколько узлов SCC содержат паттерн
-            containing_nodes = sum(1 for node in scc.nodes if str(pattern) in str(node))
             stability = containing_nodes / len(scc.nodes)
             
             # Score: комбинация частоты и стабильности
@@ -221,10 +335,138 @@ class FrequencyAnalyzer:
                 score=score
             ))
         
-        # Сортируем по score
-        candidates.sort(key=lambda c: c.score, reverse=True)
+        # Сортируем по score; если нужны только лучшие — через кучу,
+        # без полной сортировки (порядок равных score тот же, что у sort)
+        if top_k is None:
+            candidates.sort(key=lambda c: c.score, reverse=True)
+            return candidates
         
-        return candidates
+        return heapq.nlargest(top_k, candidates, key=lambda c: c.score)
+    
+    @staticmethod
+    def _frequent_substrings(nodes: List[String], min_len: int, max_len: int) -> List[Tuple[str, int, int]]:
+        """
+        Подстроки длины min_len..max_len, встречающиеся не менее двух раз:
+        (подстрока, частота, число содержащих её узлов).
+        
+        Порядок — по первому появлению (узел, длина, позиция), как при
+        подсчёте extract_substrings через Counter.
+        """
+        if NUMPY_AVAILABLE and sum(len(node) for node in nodes) >= _NUMPY_MIN_CHARS:
+            frequent = FrequencyAnalyzer._frequent_substrings_np(nodes, min_len, max_len)
+            if frequent is not None:
+                return frequent
+        
+        # Частоты по срезам data (те же подстроки, что и extract_substrings,
+        # но без объекта String на каждую). Окна всех длин узла собираются
+        # в один список: окна разной длины не совпадают, поэтому одно
+        # множество на узел точно даёт число содержащих узлов
+        counter: Counter = Counter()
+        presence: Counter = Counter()
+        
+        for node in nodes:
+            data = node.data
+            windows = [
+                data[i:i + length]
+                for length in range(min_len, max_len + 1)
+                for i in range(len(data) - length + 1)
+            ]
+            counter.update(windows)
+            presence.update(set(windows))
+        
+        return [
+            (text, frequency, presence[text])
+            for text, frequency in counter.items()
+            if frequency >= 2
+        ]
+    
+    @staticmethod
+    def _frequent_substrings_np(
+        nodes: List[String],
+        min_len: int,
+        max_len: int
+    ) -> Optional[List[Tuple[str, int, int]]]:
+        """
+        То же через NumPy: все узлы склеиваются в один массив id символов,
+        ключ окна длины L (число по основанию |алфавит|) получается из
+        ключа окна длины L-1 за одну векторную операцию, окна через
+        границу узла отбрасываются. Окна сортируются по (ключ, узел):
+        размер группы ключа — частота, число смен узла в ней — число
+        содержащих узлов. Длины окон группируются независимо, на больших
+        входах — параллельно. None, если ключи не помещаются в int64.
+        """
+        if min_len < 1 or not nodes:
+            return None
+        
+        codes = np.frombuffer(''.join(node.data for node in nodes).encode('utf-32-le'), dtype=np.uint32)
+        alphabet, ids = np.unique(codes, return_inverse=True)
+        base = max(len(alphabet), 2)
+        if base ** max_len >= 2 ** 63:
+            return None
+        
+        ids = ids.astype(np.int64)
+        lens = np.array([len(node) for node in nodes], dtype=np.int64)
+        starts = np.cumsum(lens) - lens
+        node_of = np.repeat(np.arange(len(nodes), dtype=np.int64), lens)
+        pos_of = np.arange(len(ids), dtype=np.int64) - np.repeat(starts, lens)
+        room = np.repeat(lens, lens) - pos_of  # символов до конца узла
+        
+        # keys_by_length[L] — ключи окон ids[p:p+L]; каждый следующий
+        # получается из предыдущего одной векторной операцией
+        keys_by_length: Dict[int, 'np.ndarray'] = {}
+        keys = np.zeros(len(ids), dtype=np.int64)
+        for length in range(1, max_len + 1):
+            keys = keys[:max(len(ids) - length + 1, 0)] * base + ids[length - 1:]
+            if length >= min_len:
+                keys_by_length[length] = keys
+        
+        def group(length: int) -> List[Tuple[int, int, int, int, int]]:
+            """(узел, длина, позиция первого появления, частота, число узлов)"""
+            keys = keys_by_length[length]
+            valid = np.flatnonzero(room[:len(keys)] >= length)
+            if not len(valid):
+                return []
+            
+            # Сортировка устойчивая: первый элемент группы — первое появление
+            order = valid[np.lexsort((node_of[valid], keys[valid]))]
+            sorted_keys = keys[order]
+            sorted_nodes = node_of[order]
+            new_key = np.empty(len(order), dtype=bool)
+            new_key[0] = True
+            np.not_equal(sorted_keys[1:], sorted_keys[:-1], out=new_key[1:])
+            new_node = new_key.copy()
+            new_node[1:] |= sorted_nodes[1:] != sorted_nodes[:-1]
+            
+            group_starts = np.flatnonzero(new_key)
+            counts = np.diff(np.append(group_starts, len(order)))
+            node_counts = np.add.reduceat(new_node.astype(np.int64), group_starts)
+            
+            repeated = counts >= 2
+            first = order[group_starts[repeated]]
+            return list(zip(
+                node_of[first].tolist(),
+                [length] * len(first),
+                pos_of[first].tolist(),
+                counts[repeated].tolist(),
+                node_counts[repeated].tolist()
+            ))
+        
+        # Длины окон обрабатываются независимо: на больших SCC и
+        # нескольких ядрах — параллельно в потоках
+        lengths = list(keys_by_length)
+        workers = min(len(lengths), os.cpu_count() or 1)
+        if workers > 1 and len(ids) >= _PARALLEL_MIN_CHARS:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                groups = list(executor.map(group, lengths))
+        else:
+            groups = [group(length) for length in lengths]
+        
+        found = [item for items in groups for item in items]
+        found.sort()
+        return [
+            (nodes[k].data[pos:pos + length], count, containing)
+            for k, length, pos, count, containing in found
+        ]
 
 
 class LocalConfluenceChecker:
@@ -234,6 +476,9 @@ class LocalConfluenceChecker:
     Локальная конфлюентность: если x ← y → z, то существует w: x →* w *← z
     """
     
+    # (правила, строка, глубина) -> множество достижимых строк
+    _reach_cache: Dict[Tuple, Set[String]] = {}
+    
     @staticmethod
     def check(
         original_rules: List[Rule],
@@ -258,6 +503,26 @@ class LocalConfluenceChecker:
         # Генерируем тестовые строки (критические пары)
         test_strings = LocalConfluenceChecker._generate_critical_pairs(all_rules)
         
+        # Множества достижимости по строкам: разные критические пары (и
+        # проверки разных макросов над теми же правилами) часто дают одни
+        # и те же результаты применений. Множество собирается прямо из
+        # потока iter_reach, без словаря уровней и их объединения
+        reach_cache = LocalConfluenceChecker._reach_cache
+        rules_key = _rules_key(all_rules)
+        
+        def reach_set(string: String) -> Set[String]:
+            key = (rules_key, string, search_depth)
+            reached = reach_cache.get(key)
+            if reached is None:
+                reached = {
+                    reached_string
+                    for _, reached_string in engine.iter_reach(string, search_depth, width=50)
+                }
+                if len(reach_cache) >= _REACH_CACHE_LIMIT:
+                    reach_cache.clear()
+                reach_cache[key] = reached
+            return reached
+        
         # Проверяем каждую критическую пару
         for test_string in test_strings[:20]:  # Ограничиваем число проверок
             applications = engine.all_applications(test_string)
@@ -272,22 +537,9 @@ class LocalConfluenceChecker:
             if result1 == result2:
                 continue  # Уже совпадают
             
-            # Проверяем, можно ли свести к общему результату
-            reach1 = engine.bounded_reach(result1, depth=search_depth, width=50)
-            reach2 = engine.bounded_reach(result2, depth=search_depth, width=50)
-            
-            # Ищем общую строку
-            all_reach1 = set()
-            for level_strings in reach1.values():
-                all_reach1.update(level_strings)
-            
-            all_reach2 = set()
-            for level_strings in reach2.values():
-                all_reach2.update(level_strings)
-            
-            common = all_reach1 & all_reach2
-            
-            if not common:
+            # Проверяем, можно ли свести к общему результату:
+            # достаточно одной общей строки, пересечение не строится
+            if reach_set(result1).isdisjoint(reach_set(result2)):
                 # Не нашли общую точку схождения
                 return False
         
@@ -295,21 +547,43 @@ class LocalConfluenceChecker:
     
     @staticmethod
     def _generate_critical_pairs(rules: List[Rule]) -> List[String]:
-        """Генерировать критические пары для проверки"""
-        pairs = []
-        
-        # Простая эвристика: конкатенации левых частей
-        for rule1 in rules:
-            for rule2 in rules:
-                # Overlap
-                concat = String(rule1.left.symbols + rule2.left.symbols)
-                pairs.append(concat)
-        
-        # Добавляем сами левые части
-        for rule in rules:
-            pairs.append(rule.left)
-        
-        return pairs
+        """
+        Генерировать критические пары для проверки.
+        
+        Как в Кнуте–Бендиксе: для пары правил (r1, r2) строка строится
+        только если суффикс r1.left совпадает с префиксом r2.left, и берётся
+        наибольшее такое перекрытие: r1.left + r2.left[k:]. Перекрытия всех
+        пар находятся одним AC-автоматом над левыми частями (пары без
+        перекрытия не порождают строк). Вложение r1.left внутрь r2.left
+        покрывается самими левыми частями, которые добавляются в конец.
+        Повторяющиеся строки отбрасываются.
+        """
+        left_parts = [rule.left.data for rule in rules]
+        index_of: Dict[str, List[int]] = {}
+        for i, left in enumerate(left_parts):
+            index_of.setdefault(left, []).append(i)
+        
+        overlapped: List[Tuple[int, int, str]] = []
+        for overlap in OverlapDetector.iter_overlaps_ac(list(index_of)):
+            text = overlap.pattern1 + overlap.pattern2[overlap.overlap_length:]
+            for i in index_of[overlap.pattern1]:
+                for j in index_of[overlap.pattern2]:
+                    if i != j:
+                        overlapped.append((i, j, text))
+        
+        # Перекрытие правила с самим собой (наибольшая собственная грань)
+        # и с другими правилами с той же левой частью (полное совпадение)
+        for i, left in enumerate(left_parts):
+            overlapped.extend((i, j, left) for j in index_of[left] if j != i)
+            border = OverlapDetector.find_suffix_prefix_overlap(left[1:], left)
+            if border is not None:
+                overlapped.append((i, i, left + left[border.overlap_length:]))
+        
+        # Порядок — как при попарном переборе (r1, r2)
+        overlapped.sort(key=lambda item: (item[0], item[1]))
+        texts = [text for _, _, text in overlapped] + left_parts
+        
+        return [String.from_str(text) for text in dict.fromkeys(texts)]
 
 
 class BoundedBisimulation:
@@ -320,6 +594,10 @@ class BoundedBisimulation:
     на строках длины ≤ L за D шагов.
     """
     
+    # (правила, строка, глубина) -> финальный уровень достижимости;
+    # исходная система общая для проверок всех кандидатов в макросы
+    _final_cache: Dict[Tuple, Set[str]] = {}
+    
     @staticmethod
     def check(
         original_rules: List[Rule],
@@ -347,22 +625,62 @@ class BoundedBisimulation:
         
         # Проверяем несколько случайных строк
         for test_string in test_strings[:10]:
-            # Достижимость в старой системе
-            reach_old = engine_old.bounded_reach(test_string, depth=max_depth, width=30)
-            
-            # Достижимость в новой системе (с макросом)
-            reach_new = engine_new.bounded_reach(test_string, depth=max_depth, width=30)
+            # Финальный уровень достижимости в старой системе (общий для
+            # всех кандидатов, кешируется); строки сравниваются по data —
+            # хеши и сравнения str целиком в C
+            final_old = BoundedBisimulation._final_level(engine_old, test_string, max_depth)
             
-            # Сравниваем финальные уровни (примерное сравнение)
-            final_old = reach_old.get(max_depth, set())
-            final_new = reach_new.get(max_depth, set())
-            
-            # Если множества сильно различаются, бисимуляция нарушена
-            if len(final_old.symmetric_difference(final_new)) > len(final_old) * 0.5:
+            # Сравниваем финальные уровни (примерное сравнение):
+            # если множества сильно различаются, бисимуляция нарушена
+            if BoundedBisimulation._diverges(final_old, engine_new, test_string, max_depth):
                 return False
         
         return True
     
+    @staticmethod
+    def _diverges(final_old: Set[str], engine_new: RewritingEngine, start: String, depth: int) -> bool:
+        """
+        |final_old △ final_new| > |final_old| / 2, где final_new —
+        финальный уровень новой системы.
+        
+        final_new не собирается: строки уровня depth считаются по мере
+        выдачи iter_reach, и как только строк, отсутствующих в final_old,
+        становится больше порога, обход прекращается (разность уже не
+        уменьшится).
+        """
+        threshold = len(final_old) * 0.5
+        extra = 0
+        matched = 0
+        
+        for level, string in engine_new.iter_reach(start, depth, width=30):
+            if level != depth:
+                continue
+            if string.data in final_old:
+                matched += 1
+            else:
+                extra += 1
+                if extra > threshold:
+                    return True
+        
+        return extra + len(final_old) - matched > threshold
+    
+    @staticmethod
+    def _final_level(engine: RewritingEngine, start: String, depth: int) -> Set[str]:
+        """Строки (как str), впервые достигнутые ровно на уровне depth"""
+        cache = BoundedBisimulation._final_cache
+        key = (_rules_key(engine.rules), start, depth)
+        final = cache.get(key)
+        if final is None:
+            final = {
+                string.data
+                for level, string in engine.iter_reach(start, depth, width=30)
+                if level == depth
+            }
+            if len(cache) >= _REACH_CACHE_LIMIT:
+                cache.clear()
+            cache[key] = final
+        return final
+    
     @staticmethod
     def _generate_test_strings(max_length: int) -> List[String]:
         """Генерировать тестовые строки"""
@@ -15,7 +15,7 @@ AST узлы для представления структуры текста.
 - Token: токен (базовый элемент)
 """
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, ClassVar
 from dataclasses import dataclass, field
 from enum import Enum
 
@@ -40,7 +40,7 @@ class PhraseType(Enum):
     ADJP = "adj_phrase"     # Адъективная группа
 
 
-@dataclass
+@dataclass(slots=True)
 class ASTNode:
     """
     Базовый узел AST.
@@ -54,19 +54,89 @@ class ASTNode:
     children: List['ASTNode'] = field(default_factory=list)
     metadata: Dict[str, Any] = field(default_factory=dict)
     
+    # Кеш статистик. У замороженных узлов (freeze) он постоянный, у
+    # остальных действителен, пока не было ни одного add_child: _version —
+    # значение счётчика ASTNode._mutations в момент подсчёта
+    _frozen: bool = field(default=False, init=False, repr=False, compare=False)
+    _size: Optional[int] = field(default=None, init=False, repr=False, compare=False)
+    _depth: Optional[int] = field(default=None, init=False, repr=False, compare=False)
+    _version: int = field(default=-1, init=False, repr=False, compare=False)
+    
+    # Число вызовов add_child во всех деревьях (инвалидация кешей без
+    # ссылок на родителей: узлы могут разделяться между деревьями)
+    _mutations: ClassVar[int] = 0
+    
     def add_child(self, child: 'ASTNode'):
         """Добавить дочерний узел"""
+        if self._frozen:
+            raise ValueError("Нельзя добавить потомка в замороженный узел AST")
         self.children.append(child)
+        ASTNode._mutations += 1
+    
+    def freeze(self) -> 'ASTNode':
+        """
+        Пометить поддерево неизменяемым.
+        
+        После этого depth() и size() считаются один раз и кешируются,
+        а add_child запрещён. Возвращает сам узел.
+        """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if not node._frozen:
+                node._frozen = True
+                node._size = None  # Кеш мог быть посчитан до изменений
+            stack.extend(node.children)
+        return self
+    
+    def stats(self) -> Tuple[int, int]:
+        """
+        Размер и глубина поддерева за один проход.
+        
+        Обход итеративный (пост-порядок с явным стеком), поэтому глубокие
+        документы не упираются в лимит рекурсии. Результаты кешируются в
+        узлах: повторные depth()/size() без изменений дерева через
+        add_child не обходят его заново. Дети, изменённые напрямую через
+        children, кешем не отслеживаются.
+        
+        Returns:
+            (size, depth)
+        """
+        version = ASTNode._mutations
+        if self._size is not None and (self._frozen or self._version == version):
+            return self._size, self._depth
+        
+        results: Dict[int, Tuple[int, int]] = {}
+        stack = [(self, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if node._size is not None and (node._frozen or node._version == version):
+                results[id(node)] = (node._size, node._depth)
+                continue
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children)
+                continue
+            size, depth = 1, 0
+            for child in node.children:
+                child_size, child_depth = results[id(child)]
+                size += child_size
+                if child_depth > depth:
+                    depth = child_depth
+            depth += 1
+            results[id(node)] = (size, depth)
+            node._size = size
+            node._depth = depth
+            node._version = version
+        return results[id(self)]
     
     def depth(self) -> int:
         """Глубина дерева"""
-        if not self.children:
-            return 1
-        return 1 + max(child.depth() for child in self.children)
+        return self.stats()[1]
     
     def size(self) -> int:
         """Число узлов в поддереве"""
-        return 1 + sum(child.size() for child in self.children)
+        return self.stats()[0]
     
     def __str__(self) -> str:
         if not self.children:
@@ -77,7 +147,7 @@ class ASTNode:
         return f"{self.node_type.value}[{children_str}]"
 
 
-@dataclass
+@dataclass(slots=True)
 class Token(ASTNode):
     """
     Токен - базовый элемент.
@@ -96,7 +166,7 @@ class Token(ASTNode):
         return f"Token('{self.value}')"
 
 
-@dataclass
+@dataclass(slots=True)
 class Word(ASTNode):
     """
     Слово.
@@ -116,7 +186,7 @@ class Word(ASTNode):
         return f"Word('{self.lemma}', {self.pos})"
 
 
-@dataclass
+@dataclass(slots=True)
 class Phrase(ASTNode):
     """
     Фраза.
@@ -136,7 +206,7 @@ class Phrase(ASTNode):
         return f"Phrase({self.phrase_type.value}, head={head_str})"
 
 
-@dataclass
+@dataclass(slots=True)
 class Clause(ASTNode):
     """
     Клауза (субъект-предикат).
@@ -157,7 +227,7 @@ class Clause(ASTNode):
         return f"Clause({subj} {pred})"
 
 
-@dataclass
+@dataclass(slots=True)
 class Sentence(ASTNode):
     """
     Предложение.
@@ -175,7 +245,7 @@ class Sentence(ASTNode):
         return f"Sentence('{preview}')"
 
 
-@dataclass
+@dataclass(slots=True)
 class Paragraph(ASTNode):
     """
     Параграф.
@@ -189,7 +259,7 @@ class Paragraph(ASTNode):
         self.node_type = NodeType.PARAGRAPH
 
 
-@dataclass
+@dataclass(slots=True)
 class Section(ASTNode):
     """
     Раздел.
@@ -205,7 +275,7 @@ class Section(ASTNode):
         self.node_type = NodeType.SECTION
 
 
-@dataclass
+@dataclass(slots=True)
 class Document(ASTNode):
     """
     Документ (книга/статья).
@@ -223,11 +293,16 @@ class Document(ASTNode):
         self.node_type = NodeType.DOCUMENT
 
 
-def create_simple_sentence(text: str) -> Sentence:
+def create_simple_sentence(text: str, word_cache: Optional[Dict[str, 'Word']] = None) -> Sentence:
     """
     Создать простое предложение из текста.
     
     Примитивная токенизация для демонстрации.
+    
+    Args:
+        text: Текст предложения
+        word_cache: Кеш слов (текст -> замороженный Word). Если задан,
+            одинаковые слова разных предложений — один общий узел
     """
     sentence = Sentence(text=text)
     
@@ -235,9 +310,13 @@ def create_simple_sentence(text: str) -> Sentence:
     words = text.strip().split()
     
     for word_text in words:
-        word = Word(lemma=word_text, pos="NOUN")
-        token = Token(value=word_text)
-        word.add_child(token)
+        word = word_cache.get(word_text) if word_cache is not None else None
+        if word is None:
+            word = Word(lemma=word_text, pos="NOUN")
+            token = Token(value=word_text)
+            word.add_child(token)
+            if word_cache is not None:
+                word_cache[word_text] = word.freeze()
         sentence.add_child(word)
     
     return sentence
@@ -298,6 +377,9 @@ def demo():
     print("4. Статистика AST")
     print("-" * 60)
     
+    # Документ собран: статистики дальше считаются один раз
+    doc.freeze()
+    
     print(f"Глубина дерева: {doc.depth()}")
     print(f"Всего узлов: {doc.size()}")
     print(f"Разделов: {len(doc.children)}")
@@ -20,13 +20,17 @@ from collections import Counter
 
 try:
     from .ast_nodes import ASTNode, Token, Word, NodeType
-    from ..rewriting import String, Symbol
+    from ..rewriting import String
 except ImportError:
+    # Модуль загружен вне пакета src (как скрипт или как пакет верхнего
+    # уровня text_generation): корень проекта добавляется в путь один раз
     import sys
     import os
-    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    _root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if _root_dir not in sys.path:
+        sys.path.insert(0, _root_dir)
     from src.text_generation.ast_nodes import ASTNode, Token, Word, NodeType
-    from src.rewriting import String, Symbol
+    from src.rewriting import String
 
 
 class EncodingStrategy(Enum):
@@ -43,29 +47,36 @@ class EncodedDocument:
     Attributes:
         encoded_string: Строка над {0,|}
         token_map: Отображение токен → ID
-        inverse_map: Отображение ID → токен
+        inverse_list: Отображение ID → токен (список, индекс = ID;
+            позиция 0 — разделитель)
         statistics: Статистика кодирования
     """
     encoded_string: String
     token_map: Dict[str, int]
-    inverse_map: Dict[int, str]
+    inverse_list: List[str]
     statistics: Dict
     
+    @property
+    def inverse_map(self) -> Dict[int, str]:
+        """Отображение ID → токен в виде словаря (для совместимости)"""
+        return {i: token for i, token in enumerate(self.inverse_list) if i}
+    
     def decode(self) -> str:
         """
         Декодировать обратно в текст (примерно).
         
         Note: Полное восстановление требует сохранения структуры AST
         """
-        # Простая реконструкция: извлекаем блоки и переводим в токены
+        # Простая реконструкция: извлекаем блоки (split по '|' в C, без
+        # посимвольного разбора) и переводим в токены одним поиском в словаре
         blocks = self.encoded_string.get_blocks()
+        inverse = self.inverse_list
+        size = len(inverse)
         
         tokens = []
         for block_id in blocks:
-            if block_id in self.inverse_map:
-                tokens.append(self.inverse_map[block_id])
-            else:
-                tokens.append(f"<UNK_{block_id}>")
+            # ID плотные, поэтому поиск — индексация списка без хеширования
+            tokens.append(inverse[block_id] if 0 < block_id < size else f"<UNK_{block_id}>")
         
         return ' '.join(tokens)
 
@@ -77,10 +88,16 @@ class Linearizer:
     Преобразует дерево в плоскую строку с сохранением информации.
     """
     
-    def __init__(self, strategy: EncodingStrategy = EncodingStrategy.UNARY):
+    def __init__(self, strategy: EncodingStrategy = EncodingStrategy.UNARY,
+                 frequency_ids: bool = True):
         self.strategy = strategy
+        # True — ID назначаются по частоте (частые → меньшие ID, три прохода);
+        # False — по первому появлению за один проход без списка токенов
+        self.frequency_ids = frequency_ids
         self.token_vocabulary: Dict[str, int] = {}
         self.next_id = 1  # 0 зарезервирован для разделителя
+        # Обратная карта ID → токен, пополняется вместе со словарём
+        self.inverse_list: List[str] = ['']
     
     def linearize(self, ast: ASTNode) -> EncodedDocument:
         """
@@ -92,14 +109,18 @@ class Linearizer:
         Returns:
             Закодированный документ
         """
-        # Шаг 1: Собираем все токены
+        if not self.frequency_ids:
+            return self._linearize_fused(ast)
+        
+        # Шаг 1: Собираем все токены и один раз считаем их частоты
         tokens = self._collect_tokens(ast)
+        frequencies = Counter(tokens)
         
         # Шаг 2: Строим словарь
-        self._build_vocabulary(tokens)
+        self._build_vocabulary(frequencies)
         
         # Шаг 3: Кодируем
-        encoded = self._encode_tokens(tokens)
+        encoded = self._encode_tokens(tokens, frequencies)
         
         # Статистика
         stats = {
@@ -109,86 +130,158 @@ class Linearizer:
             'compression_ratio': len(encoded) / len(tokens) if tokens else 0
         }
         
-        # Обратная карта
-        inverse = {v: k for k, v in self.token_vocabulary.items()}
-        
         return EncodedDocument(
             encoded_string=encoded,
             token_map=self.token_vocabulary,
-            inverse_map=inverse,
+            inverse_list=self.inverse_list,
+            statistics=stats
+        )
+    
+    def _linearize_fused(self, ast: ASTNode) -> EncodedDocument:
+        """
+        Линеаризация за один обход: сбор токенов, пополнение словаря и
+        кодирование слиты вместе.
+        
+        ID назначаются в порядке первого появления токена, поэтому
+        кодировка длиннее частотной, зато нет промежуточного списка
+        токенов и повторных проходов по нему.
+        """
+        token_type = NodeType.TOKEN
+        token_cls = NodeType
+        vocabulary = self.token_vocabulary
+        inverse = self.inverse_list
+        next_id = self.next_id
+        
+        # Блок 0^ID строится один раз на токен, повторы делят объект str
+        block_of: Dict[str, str] = {}
+        blocks = []
+        
+        stack = [ast]
+        while stack:
+            n = stack.pop()
+            node_type = n.node_type
+            if node_type is token_type or (node_type.__class__ is not token_cls
+                                           and node_type is not None
+                                           and node_type.value == 'token'):
+                val = getattr(n, 'value', None)
+                if val:
+                    block = block_of.get(val)
+                    if block is None:
+                        token_id = vocabulary.get(val)
+                        if token_id is None:
+                            token_id = next_id
+                            vocabulary[val] = token_id
+                            inverse.append(val)
+                            next_id += 1
+                        block = block_of[val] = '0' * token_id
+                    blocks.append(block)
+            
+            children = n.children
+            if children:
+                stack.extend(reversed(children))
+        
+        self.next_id = next_id
+        encoded = String.from_str('|'.join(blocks))
+        
+        stats = {
+            'original_tokens': len(blocks),
+            'unique_tokens': len(vocabulary),
+            'encoded_length': len(encoded),
+            'compression_ratio': len(encoded) / len(blocks) if blocks else 0
+        }
+        
+        return EncodedDocument(
+            encoded_string=encoded,
+            token_map=vocabulary,
+            inverse_list=inverse,
             statistics=stats
         )
     
     def _collect_tokens(self, node: ASTNode) -> List[str]:
         """Собрать все токены из AST (depth-first)"""
         result = []
+        token_type = NodeType.TOKEN
+        token_cls = NodeType
         
-        def traverse(n: ASTNode, acc: List[str]):
-            # Проверяем тип узла по значению (чтобы не зависеть от импорта)
-            if n.node_type and n.node_type.value == 'token':
-                # Извлекаем значение токена
-                if hasattr(n, 'value'):
-                    val = getattr(n, 'value', None)
-                    if val:
-                        acc.append(val)
+        # Итеративный обход с явным стеком: дети кладутся в обратном
+        # порядке, чтобы порядок токенов совпадал с рекурсивным обходом
+        stack = [node]
+        while stack:
+            n = stack.pop()
+            node_type = n.node_type
+            # Тип сверяется по идентичности, а при другом экземпляре модуля
+            # ast_nodes (запуск как скрипт) — по значению; для «своего»
+            # NodeType медленное чтение .value не нужно
+            if node_type is token_type or (node_type.__class__ is not token_cls
+                                           and node_type is not None
+                                           and node_type.value == 'token'):
+                val = getattr(n, 'value', None)
+                if val:
+                    result.append(val)
             
-            # Рекурсивно обходим детей
-            for child in n.children:
-                traverse(child, acc)
+            children = n.children
+            if children:
+                stack.extend(reversed(children))
         
-        traverse(node, result)
         return result
     
-    def _build_vocabulary(self, tokens: List[str]):
-        """Построить словарь токен → ID"""
-        # Считаем частоты
-        counter = Counter(tokens)
+    def _build_vocabulary(self, frequencies: Counter):
+        """Построить словарь токен → ID по частотам токенов"""
+        # Корзины по частоте: различных частот мало (почти все токены
+        # встречаются 1-2 раза), поэтому сортируются только они, а не все
+        # токены. Внутри корзины — порядок первого появления, как у
+        # most_common
+        buckets: Dict[int, List[str]] = {}
+        for token, freq in frequencies.items():
+            bucket = buckets.get(freq)
+            if bucket is None:
+                buckets[freq] = [token]
+            else:
+                bucket.append(token)
         
         # Присваиваем ID по частоте (частые → меньшие ID)
-        for token, freq in counter.most_common():
-            if token not in self.token_vocabulary:
-                self.token_vocabulary[token] = self.next_id
-                self.next_id += 1
-    
-    def _encode_tokens(self, tokens: List[str]) -> String:
+        vocabulary = self.token_vocabulary
+        inverse = self.inverse_list
+        next_id = self.next_id
+        for freq in sorted(buckets, reverse=True):
+            for token in buckets[freq]:
+                if token not in vocabulary:
+                    vocabulary[token] = next_id
+                    inverse.append(token)
+                    next_id += 1
+        self.next_id = next_id
+    
+    def _encode_tokens(self, tokens: List[str], frequencies: Optional[Counter] = None) -> String:
         """Кодировать токены в строку"""
         if self.strategy == EncodingStrategy.UNARY:
-            return self._encode_unary(tokens)
+            return self._encode_unary(tokens, frequencies)
         elif self.strategy == EncodingStrategy.COMPACT:
-            return self._encode_compact(tokens)
+            return self._encode_compact(tokens, frequencies)
         else:
-            return self._encode_unary(tokens)
+            return self._encode_unary(tokens, frequencies)
     
-    def _encode_unary(self, tokens: List[str]) -> String:
+    def _encode_unary(self, tokens: List[str], frequencies: Optional[Counter] = None) -> String:
         """
         Унарное кодирование.
         
         Формат: ID₁|ID₂|ID₃|...
         где IDᵢ = 0^n
         """
-        symbols = []
-        
-        for i, token in enumerate(tokens):
-            token_id = self.token_vocabulary.get(token, 0)
-            
-            # Добавляем разделитель (кроме начала)
-            if i > 0:
-                symbols.append(Symbol('|'))
-            
-            # Добавляем унарное представление ID
-            for _ in range(token_id):
-                symbols.append(Symbol('0'))
-        
-        return String(tuple(symbols))
-    
-    def _encode_compact(self, tokens: List[str]) -> String:
+        # Блок 0^ID строится один раз на уникальный токен (повторы
+        # используют тот же объект str), затем всё склеивается одним join
+        unique = frequencies if frequencies is not None else dict.fromkeys(tokens)
+        vocabulary = self.token_vocabulary
+        blocks = {token: '0' * vocabulary.get(token, 0) for token in unique}
+        return String.from_str('|'.join(map(blocks.__getitem__, tokens)))
+    
+    def _encode_compact(self, tokens: List[str], frequencies: Optional[Counter] = None) -> String:
         """
         Компактное кодирование (с возможными макросами).
         
         Здесь можно использовать словарь макросов для частых последовательностей.
         """
         # Пока аналогично унарному, но можно расширить
-        return self._encode_unary(tokens)
+        return self._encode_unary(tokens, frequencies)
 
 
 def demo():
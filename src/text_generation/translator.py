@@ -13,10 +13,14 @@
 - Страны (countries)
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Iterator
 from dataclasses import dataclass
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 import csv
 import json
+import os
+import pickle
 
 try:
     from .ast_nodes import (
@@ -24,16 +28,19 @@ try:
         Word, Token, create_simple_sentence
     )
 except ImportError:
+    # Модуль загружен вне пакета src (как скрипт или как пакет верхнего
+    # уровня text_generation): корень проекта добавляется в путь один раз
     import sys
-    import os
-    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    _root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if _root_dir not in sys.path:
+        sys.path.insert(0, _root_dir)
     from src.text_generation.ast_nodes import (
         Document, Section, Paragraph, Sentence,
         Word, Token, create_simple_sentence
     )
 
 
-@dataclass
+@dataclass(slots=True)
 class Fact:
     """
     Факт из базы данных.
@@ -71,25 +78,44 @@ class FactLoader:
         Returns:
             Список фактов
         """
-        facts = []
+        return list(FactLoader.iter_csv(filename, domain))
+    
+    @staticmethod
+    def iter_csv(filename: str, domain: str) -> Iterator[Fact]:
+        """
+        Читать факты из CSV по одному, не загружая файл целиком.
+        
+        Args:
+            filename: Путь к CSV файлу
+            domain: Домен данных
+            
+        Yields:
+            Факты в порядке строк файла
+        """
+        # Повторяющиеся значения (категории, единицы) хранятся одним
+        # объектом str на весь файл
+        shared_values: Dict[str, str] = {}
         
         try:
             with open(filename, 'r', encoding='utf-8') as f:
                 reader = csv.DictReader(f)
                 for row in reader:
+                    # DictReader создаёт новый dict на строку: он и становится
+                    # properties, без копии; ключи — общие строки заголовка
+                    for key, value in row.items():
+                        if isinstance(value, str):
+                            row[key] = shared_values.setdefault(value, value)
+                    
                     # Первая колонка - имя объекта
                     entity = next(iter(row.values()))
-                    properties = {k: v for k, v in row.items()}
                     
-                    facts.append(Fact(
+                    yield Fact(
                         domain=domain,
                         entity=entity,
-                        properties=properties
-                    ))
+                        properties=row
+                    )
         except FileNotFoundError:
             print(f"Warning: CSV file {filename} not found")
-        
-        return facts
     
     @staticmethod
     def from_dict_list(data: List[Dict], domain: str, entity_key: str = "name") -> List[Fact]:
@@ -117,6 +143,17 @@ class FactLoader:
         return facts
 
 
+# Число фактов, начиная с которого разделы доменов строятся в отдельных
+# процессах: на малых входах пересылка фактов и AST дороже построения
+_PARALLEL_MIN_FACTS = 20_000
+
+
+def _build_section(job) -> Section:
+    """Построить раздел домена в процессе-исполнителе"""
+    translator, domain, facts = job
+    return translator._create_section(domain, facts)
+
+
 class Translator:
     """
     Транслятор фактов в AST.
@@ -124,44 +161,92 @@ class Translator:
     Использует шаблоны для генерации структурированного текста.
     """
     
+    # Максимальное число предложений в кеше разбора
+    _SENTENCE_CACHE_LIMIT = 8192
+    
     def __init__(self):
         self.templates = {
             'planets': self._planet_templates,
             'elements': self._element_templates,
             'default': self._default_templates
         }
+        
+        # Текст предложения -> разобранное замороженное предложение.
+        # Шаблоны дают много одинаковых предложений (общие категории,
+        # значения свойств); замороженный узел безопасно разделять между
+        # параграфами — добавить в него потомков нельзя
+        self._sentence_cache: Dict[str, Sentence] = {}
+        
+        # Текст слова -> замороженный Word: постоянные части шаблонов
+        # ("is a planet in the ...") разделяются всеми предложениями,
+        # новые узлы создаются только для подставленных значений
+        self._word_cache: Dict[str, Word] = {}
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        # Кеши разбора не пересылаются в процессы-исполнители
+        state = self.__dict__.copy()
+        state['_sentence_cache'] = {}
+        state['_word_cache'] = {}
+        return state
     
-    def translate(self, facts: List[Fact], title: str = "Generated Document") -> Document:
+    def translate(self, facts: Iterable[Fact], title: str = "Generated Document",
+                  max_workers: Optional[int] = 1) -> Document:
         """
         Транслировать факты в документ.
         
         Args:
-            facts: Список фактов
+            facts: Факты (список или поток, например FactLoader.iter_csv)
             title: Название документа
+            max_workers: Число процессов для построения разделов
+                (1 — последовательно, None — по числу ядер). Параллельный
+                режим требует защиты точки входа
+                (if __name__ == "__main__") при методе запуска spawn
             
         Returns:
             AST документа
         """
+        # Группируем факты по домену за один проход по потоку
+        by_domain: Dict[str, List[Fact]] = defaultdict(list)
+        count = 0
+        for fact in facts:
+            by_domain[fact.domain].append(fact)
+            count += 1
+        
         doc = Document(
             title=title,
             author="Space Language System",
-            abstract=f"Document generated from {len(facts)} facts"
+            abstract=f"Document generated from {count} facts"
         )
         
-        # Группируем факты по домену
-        by_domain = {}
-        for fact in facts:
-            if fact.domain not in by_domain:
-                by_domain[fact.domain] = []
-            by_domain[fact.domain].append(fact)
-        
-        # Создаём раздел для каждого домена
-        for domain, domain_facts in by_domain.items():
-            section = self._create_section(domain, domain_facts)
+        # Создаём раздел для каждого домена. Домены независимы, поэтому по
+        # запросу (max_workers != 1) на больших входах разделы строятся в
+        # отдельных процессах (шаблоны чистые, построение AST упирается в
+        # GIL). Исполнители получают копию этого транслятора с его
+        # шаблонами, но без кешей; непередаваемый транслятор работает
+        # последовательно
+        workers = min(len(by_domain), max_workers or os.cpu_count() or 1)
+        if workers > 1 and count >= _PARALLEL_MIN_FACTS and self._picklable():
+            jobs = [(self, domain, domain_facts)
+                    for domain, domain_facts in by_domain.items()]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                sections = list(executor.map(_build_section, jobs))
+        else:
+            sections = [self._create_section(domain, domain_facts)
+                        for domain, domain_facts in by_domain.items()]
+        
+        for section in sections:
             doc.add_child(section)
         
         return doc
     
+    def _picklable(self) -> bool:
+        """Можно ли передать транслятор в другой процесс (например, шаблоны-лямбды нельзя)"""
+        try:
+            pickle.dumps(self)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            return False
+        return True
+    
     def _create_section(self, domain: str, facts: List[Fact]) -> Section:
         """Создать раздел для домена"""
         section = Section(
@@ -188,11 +273,21 @@ class Translator:
         
         for sent_text in sentences:
             if sent_text:  # Пропускаем пустые
-                sentence = create_simple_sentence(sent_text)
-                para.add_child(sentence)
+                para.add_child(self._sentence(sent_text))
         
         return para
     
+    def _sentence(self, text: str) -> Sentence:
+        """Разобранное предложение (общее для одинаковых текстов)"""
+        sentence = self._sentence_cache.get(text)
+        if sentence is None:
+            if len(self._sentence_cache) >= self._SENTENCE_CACHE_LIMIT:
+                self._sentence_cache.clear()
+                self._word_cache.clear()
+            sentence = create_simple_sentence(text, self._word_cache).freeze()
+            self._sentence_cache[text] = sentence
+        return sentence
+    
     # ===== Шаблоны для разных доменов =====
     
     def _planet_templates(self, fact: Fact) -> List[str]:
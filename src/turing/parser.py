@@ -16,8 +16,15 @@
 """
 
 from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
+from collections import defaultdict
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
 
 
 class Direction(Enum):
@@ -50,10 +57,58 @@ class TuringMachine:
     initial_state: int = 0
     accept_states: List[int] = None
     
+    # Кеш плотной таблицы (см. dense_table)
+    _table: Optional['np.ndarray'] = field(default=None, init=False, repr=False, compare=False)
+    
     def __post_init__(self):
         if self.accept_states is None:
             self.accept_states = []
     
+    def dense_table(self) -> Optional['np.ndarray']:
+        """
+        Плотная таблица переходов детерминированной TM.
+        
+        Массив int32 формы (K, 2, 3): table[q, s] = (write, direction,
+        next_state), где s и write — 0 для '0' и 1 для '|', direction —
+        0 для LEFT и 1 для RIGHT, K — число состояний (max + 1). Для пар
+        без перехода — (-1, -1, -1). Индексация массива заменяет поиск
+        по словарю и подходит для компилируемых (Numba) циклов. Строится
+        при первом вызове и кешируется.
+        
+        Returns:
+            Таблица или None, если TM недетерминирована, символы вне
+            {0,|} или NumPy недоступен
+        """
+        if self._table is not None:
+            return self._table
+        if not NUMPY_AVAILABLE:
+            return None
+        
+        rows = []
+        for (state, symbol), transitions in self.transitions.items():
+            if len(transitions) != 1 or symbol not in _SYMBOL_INDEX:
+                return None
+            trans = transitions[0]
+            if trans.write not in _SYMBOL_INDEX or state < 0 or trans.next_state < 0:
+                return None
+            rows.append((
+                state,
+                _SYMBOL_INDEX[symbol],
+                _SYMBOL_INDEX[trans.write],
+                0 if trans.direction == Direction.LEFT else 1,
+                trans.next_state
+            ))
+        
+        states = [self.initial_state, *self.accept_states]
+        states.extend(row[0] for row in rows)
+        states.extend(row[4] for row in rows)
+        table = np.full((max(states) + 1, 2, 3), -1, dtype=np.int32)
+        for state, symbol, write, direction, next_state in rows:
+            table[state, symbol] = (write, direction, next_state)
+        
+        self._table = table
+        return table
+    
     def get_transitions(self, state: int, symbol: str) -> List[Transition]:
         """Получить все возможные переходы из (state, symbol)"""
         return self.transitions.get((state, symbol), [])
@@ -63,17 +118,25 @@ class TuringMachine:
         return state in self.accept_states
 
 
+# Индекс символа ленты в плотной таблице переходов
+_SYMBOL_INDEX = {'0': 0, '|': 1}
+
+# Блок направления → Direction
+_DIRECTION_OF = {'0': Direction.LEFT, '|': Direction.RIGHT}
+
+
 def decode_unary(s: str) -> int:
     """
     Декодировать унарное число.
     '0' -> 1, '00' -> 2, '000' -> 3, ...
     Пустая строка -> 0
     """
-    if not s:
-        return 0
-    if all(c == '0' for c in s):
-        return len(s)
-    raise ValueError(f"Invalid unary string: {s}")
+    # Проверка одним проходом в C: после удаления всех '0' ничего не
+    # остаётся (как в String.get_blocks); на коротких строках состояний
+    # быстрее str.count, на длинных — не медленнее
+    if s.replace('0', ''):
+        raise ValueError(f"Invalid unary string: {s}")
+    return len(s)
 
 
 def parse_transition(trans_str: str) -> Transition:
@@ -94,24 +157,30 @@ def parse_transition(trans_str: str) -> Transition:
     if len(parts) != 5:
         raise ValueError(f"Invalid transition format: {trans_str} (expected 5 parts, got {len(parts)})")
     
-    state_str, read, write, dir_str, next_state_str = parts
-    
+    return _transition_from_parts(*parts)
+
+
+def _transition_from_parts(
+    state_str: str,
+    read: str,
+    write: str,
+    dir_str: str,
+    next_state_str: str
+) -> Transition:
+    """Собрать Transition из пяти уже разделённых блоков q|s|s'|d|q'"""
     # Декодируем состояния (унарные числа)
     state = decode_unary(state_str) if state_str else 0
     next_state = decode_unary(next_state_str) if next_state_str else 0
     
-    # Проверяем символы
-    if read not in ('0', '|'):
+    # Проверяем символы (поиск в словаре вместо цепочки сравнений)
+    if read not in _SYMBOL_INDEX:
         raise ValueError(f"Invalid read symbol: {read}")
-    if write not in ('0', '|'):
+    if write not in _SYMBOL_INDEX:
         raise ValueError(f"Invalid write symbol: {write}")
     
-    # Направление
-    if dir_str == '0':
-        direction = Direction.LEFT
-    elif dir_str == '|':
-        direction = Direction.RIGHT
-    else:
+    # Направление — одним поиском в таблице
+    direction = _DIRECTION_OF.get(dir_str)
+    if direction is None:
         raise ValueError(f"Invalid direction: {dir_str}")
     
     return Transition(
@@ -143,27 +212,25 @@ def parse_tm(tm_str: str) -> TuringMachine:
     if len(parts) % 5 != 0:
         raise ValueError(f"Invalid TM format: number of parts {len(parts)} is not divisible by 5")
     
-    transitions_dict: Dict[Tuple[int, str], List[Transition]] = {}
+    transitions_dict: Dict[Tuple[int, str], List[Transition]] = defaultdict(list)
     all_states = set()
     
-    # Парсим транзиции
+    # Парсим транзиции прямо из блоков одного split, без повторной
+    # склейки и разбиения каждой пятёрки
     for i in range(0, len(parts), 5):
-        trans_parts = '|'.join(parts[i:i+5])
-        trans = parse_transition(trans_parts)
+        trans = _transition_from_parts(*parts[i:i+5])
         
         all_states.add(trans.state)
         all_states.add(trans.next_state)
         
-        key = (trans.state, trans.read)
-        if key not in transitions_dict:
-            transitions_dict[key] = []
-        transitions_dict[key].append(trans)
+        transitions_dict[(trans.state, trans.read)].append(trans)
     
     # По умолчанию: принимающее состояние = максимальное
     accept_states = [max(all_states)] if all_states else [0]
     
     return TuringMachine(
-        transitions=transitions_dict,
+        # Обычный dict: get_transitions не должен создавать пустые списки
+        transitions=dict(transitions_dict),
         initial_state=0,
         accept_states=accept_states
     )
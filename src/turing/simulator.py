@@ -5,10 +5,82 @@
 Проверяет достижимость целевого значения за D шагов с ограничением W состояний.
 """
 
-from typing import List, Optional, Set, Tuple
-from dataclasses import dataclass
-from collections import deque
-from .parser import TuringMachine, Direction
+from typing import List, Optional, Tuple, Dict
+from dataclasses import dataclass, field
+from .parser import TuringMachine, Transition, Direction
+
+try:
+    import numpy as np
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+# Лимит шагов min(max_steps, max_configs), начиная с которого
+# детерминированная TM прогоняется скомпилированным циклом
+_NUMBA_MIN_STEPS = 1000
+
+# Верхняя граница того же лимита: лента ядра выделяется на весь прогон
+_NUMBA_MAX_STEPS = 10_000_000
+
+# Исходы прогона _run_deterministic
+_RUN_ACCEPTED = 0
+_RUN_ENDED = 1
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _run_deterministic(table, accepting, initial_state, input_len,
+                           target, max_steps, max_configs):
+        """
+        Прогон детерминированной TM по плотной таблице (см. dense_table).
+        
+        Повторяет BFS из simulate для цепочки из одной конфигурации на
+        шаге, без множества посещённых. Лента — массив int8 (0 — '0',
+        1 — '|'), занятая часть — [lo, hi), как у Tape.cells.
+        Возвращает (исход, номер_конфигурации, значение, состояние):
+        для _RUN_ACCEPTED — найденная конфигурация, для _RUN_ENDED —
+        число просмотренных конфигураций.
+        """
+        limit = min(max_steps, max_configs)
+        origin = limit + 1
+        tape = np.zeros(input_len + 2 * limit + 3, dtype=np.int8)
+        lo = origin
+        hi = origin + max(input_len, 1)
+        head = origin
+        state = initial_state
+        n_states = table.shape[0]
+        
+        i = 0
+        while i < max_configs:
+            if state < accepting.shape[0] and accepting[state]:
+                value = 0
+                pos = lo
+                while pos < hi and tape[pos] == 0:
+                    value += 1
+                    pos += 1
+                if target < 0 or value == target:
+                    return _RUN_ACCEPTED, i, value, state
+            
+            if i >= max_steps or state >= n_states:
+                return _RUN_ENDED, i + 1, 0, state
+            
+            symbol = tape[head] if lo <= head < hi else 0
+            write = table[state, symbol, 0]
+            if write < 0:
+                return _RUN_ENDED, i + 1, 0, state
+            
+            if head < lo:
+                lo = head
+            elif head >= hi:
+                hi = head + 1
+            tape[head] = write
+            head += 1 if table[state, symbol, 1] == 1 else -1
+            state = table[state, symbol, 2]
+            i += 1
+        
+        return _RUN_ENDED, max_configs, 0, state
 
 
 @dataclass
@@ -16,12 +88,22 @@ class Tape:
     """
     Лента машины Тьюринга (двусторонне бесконечная).
     
-    Реализация: используем список для центральной части,
-    пустые клетки за границами считаются '0' (blank).
+    Реализация: центральная часть хранится одной неизменяемой строкой
+    (список клеток при создании склеивается), пустые клетки за границами
+    считаются '0' (blank). Копия ленты разделяет строку, запись создаёт
+    новую; хеш строки CPython кеширует сам.
+    
+    Хеш кешируется и сбрасывается в write/move; при прямом изменении
+    cells или head кеш нужно сбросить вручную (_hash = None).
     """
-    cells: List[str]
+    cells: str
     head: int  # Позиция головки (может быть отрицательной)
     blank: str = '0'  # Символ пустой клетки
+    _hash: Optional[int] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        if not isinstance(self.cells, str):
+            self.cells = ''.join(self.cells)
     
     def read(self) -> str:
         """Прочитать символ в текущей позиции"""
@@ -31,21 +113,25 @@ class Tape:
     
     def write(self, symbol: str):
         """Записать символ в текущую позицию"""
-        # Расширяем ленту при необходимости
-        if self.head < 0:
+        self._hash = None
+        
+        # Расширение ленты и запись — одна сборка новой строки: символ
+        # ставится прямо на место крайней добавленной клетки
+        head = self.head
+        cells = self.cells
+        if head < 0:
             # Добавляем клетки слева
-            extend = -self.head
-            self.cells = [self.blank] * extend + self.cells
+            self.cells = symbol + self.blank * (-head - 1) + cells
             self.head = 0
-        elif self.head >= len(self.cells):
+        elif head >= len(cells):
             # Добавляем клетки справа
-            extend = self.head - len(self.cells) + 1
-            self.cells.extend([self.blank] * extend)
-        
-        self.cells[self.head] = symbol
+            self.cells = cells + self.blank * (head - len(cells)) + symbol
+        else:
+            self.cells = cells[:head] + symbol + cells[head + 1:]
     
     def move(self, direction: Direction):
         """Переместить головку"""
+        self._hash = None
         if direction == Direction.LEFT:
             self.head -= 1
         else:  # Direction.RIGHT
@@ -53,8 +139,9 @@ class Tape:
     
     def copy(self) -> 'Tape':
         """Создать копию ленты"""
+        # Строка неизменяема — копировать клетки не нужно
         return Tape(
-            cells=self.cells[:],
+            cells=self.cells,
             head=self.head,
             blank=self.blank
         )
@@ -66,12 +153,9 @@ class Tape:
         Считаем блок из '0' справа от головки.
         Например: |00000| -> 5
         """
-        count = 0
-        pos = 0
-        while pos < len(self.cells) and self.cells[pos] == '0':
-            count += 1
-            pos += 1
-        return count
+        # Длина ведущего блока '0' — одним проходом lstrip в C
+        cells = self.cells
+        return len(cells) - len(cells.lstrip('0'))
     
     def __str__(self) -> str:
         """Представление ленты для отладки"""
@@ -79,7 +163,7 @@ class Tape:
         start = max(0, self.head - 5)
         end = min(len(self.cells), self.head + 6)
         
-        tape_str = ''.join(self.cells[start:end])
+        tape_str = self.cells[start:end]
         head_pos = self.head - start
         
         pointer = ' ' * head_pos + '^'
@@ -87,7 +171,12 @@ class Tape:
     
     def __hash__(self) -> int:
         """Хеш для использования в множествах"""
-        return hash((tuple(self.cells), self.head))
+        # Хеш пары (клетки, головка) считается один раз, а не при каждой
+        # проверке visited в BFS
+        h = self._hash
+        if h is None:
+            h = self._hash = hash((self.cells, self.head))
+        return h
     
     def __eq__(self, other) -> bool:
         if not isinstance(other, Tape):
@@ -101,6 +190,11 @@ class Configuration:
     state: int
     tape: Tape
     
+    def key(self) -> Tuple[int, str, int]:
+        """Ключ (состояние, клетки, головка): хешируется и сравнивается в C"""
+        tape = self.tape
+        return (self.state, tape.cells, tape.head)
+    
     def __hash__(self) -> int:
         return hash((self.state, self.tape))
     
@@ -120,6 +214,22 @@ class SimulationResult:
     message: str = ""  # Дополнительная информация
 
 
+def _pack_transitions(tm: TuringMachine) -> Optional[List[Optional[List[Transition]]]]:
+    """
+    Переходы TM плоским списком с индексом (state << 1) | (symbol == '|')
+    (None — перехода нет), или None, если символы вне {0,|}
+    """
+    keys = tm.transitions.keys()
+    for state, symbol in keys:
+        if symbol not in ('0', '|') or not isinstance(state, int) or state < 0:
+            return None
+    
+    packed: List[Optional[List[Transition]]] = [None] * (2 * max((state for state, _ in keys), default=-1) + 2)
+    for (state, symbol), transitions in tm.transitions.items():
+        packed[(state << 1) | (symbol == '|')] = transitions
+    return packed
+
+
 class TMSimulator:
     """
     Недетерминированный симулятор машины Тьюринга.
@@ -129,6 +239,26 @@ class TMSimulator:
     
     def __init__(self, tm: TuringMachine):
         self.tm = tm
+        
+        # Плотная таблица переходов с индексом (state << 1) | (symbol == '|'):
+        # в шаге симуляции — индексация списка вместо вызова
+        # get_transitions с кортежем. Строится, если все символы из {0,|};
+        # иначе None
+        self._packed = _pack_transitions(tm)
+        
+        # Детерминированная TM прогоняется скомпилированным циклом:
+        # плотная таблица переходов и маска принимающих состояний
+        self._table = None
+        self._accepting = None
+        if NUMBA_AVAILABLE and tm.initial_state >= 0:
+            table = tm.dense_table()
+            if table is not None:
+                accepting = np.zeros(table.shape[0], dtype=np.bool_)
+                for state in tm.accept_states:
+                    if 0 <= state < table.shape[0]:
+                        accepting[state] = True
+                self._table = table
+                self._accepting = accepting
     
     def step(self, config: Configuration) -> List[Configuration]:
         """
@@ -138,7 +268,12 @@ class TMSimulator:
         (для недетерминированных переходов).
         """
         current_symbol = config.tape.read()
-        transitions = self.tm.get_transitions(config.state, current_symbol)
+        packed = self._packed
+        if packed is not None and (current_symbol == '0' or current_symbol == '|'):
+            index = (config.state << 1) | (current_symbol == '|')
+            transitions = packed[index] if 0 <= index < len(packed) else None
+        else:
+            transitions = self.tm.get_transitions(config.state, current_symbol)
         
         if not transitions:
             # Нет переходов - машина останавливается
@@ -165,7 +300,8 @@ class TMSimulator:
         input_value: int,
         target_value: Optional[int] = None,
         max_steps: int = 1000,
-        max_configs: int = 10000
+        max_configs: int = 10000,
+        return_path: bool = False
     ) -> SimulationResult:
         """
         Симулировать TM с заданным входом.
@@ -175,13 +311,23 @@ class TMSimulator:
             target_value: Целевое значение (если None, просто симулируем)
             max_steps: Максимальное число шагов
             max_configs: Максимальное число конфигураций (ограничение памяти)
+            return_path: Восстановить путь выполнения (SimulationResult.path);
+                без него ссылки на родителей не хранятся
             
         Returns:
             SimulationResult
         """
+        limit = min(max_steps, max_configs)
+        if self._table is not None and _NUMBA_MIN_STEPS <= limit <= _NUMBA_MAX_STEPS:
+            result = self._simulate_compiled(
+                input_value, target_value, max_steps, max_configs, return_path
+            )
+            if result is not None:
+                return result
+        
         # Инициализация: лента содержит унарное представление входа
         initial_tape = Tape(
-            cells=['0'] * input_value if input_value > 0 else ['0'],
+            cells='0' * input_value if input_value > 0 else '0',
             head=0
         )
         
@@ -190,40 +336,71 @@ class TMSimulator:
             tape=initial_tape
         )
         
-        # BFS
-        queue = deque([(initial_config, [initial_config], 0)])
-        visited: Set[Configuration] = {initial_config}
+        # BFS. Вместо копии пути для каждой конфигурации хранится
+        # ссылка на родителя: путь восстанавливается один раз при успехе.
+        # Словарь родителей служит и множеством посещённых: конфигурация
+        # отмечается при постановке в очередь, одной записью. Ключ —
+        # кортеж Configuration.key(), без вызовов __hash__/__eq__ на Python.
+        # Без return_path вместо родителя хранится None, и пройденные
+        # конфигурации не удерживаются в памяти
+        parent: Dict[Tuple[int, str, int], Optional[Configuration]] = {
+            initial_config.key(): None
+        }
+        is_accepting = self.tm.is_accepting
+        step = self.step
         
         configs_explored = 0
         
-        while queue and configs_explored < max_configs:
-            config, path, steps = queue.popleft()
-            configs_explored += 1
+        # Обход по уровням: очередь FIFO заменена списками уровней (тот же
+        # порядок), номер шага — номер уровня, а не поле каждого элемента
+        frontier = [initial_config]
+        steps = 0
+        
+        while frontier and configs_explored < max_configs:
+            next_frontier = []
             
-            # Проверяем достижение цели
-            if self.tm.is_accepting(config.state):
-                final_value = config.tape.to_unary()
+            for config in frontier:
+                if configs_explored >= max_configs:
+                    break
+                configs_explored += 1
+                link = config if return_path else None
                 
-                if target_value is None or final_value == target_value:
-                    return SimulationResult(
-                        status="SUCCESS",
-                        steps=steps,
-                        final_value=final_value,
-                        path=path,
-                        message=f"Reached accepting state q{config.state} in {steps} steps"
-                    )
-            
-            # Проверяем лимит шагов
-            if steps >= max_steps:
-                continue
-            
-            # Следующие конфигурации
-            next_configs = self.step(config)
+                # Проверяем достижение цели
+                if is_accepting(config.state):
+                    final_value = config.tape.to_unary()
+                    
+                    if target_value is None or final_value == target_value:
+                        path = None
+                        if return_path:
+                            path = []
+                            node = config
+                            while node is not None:
+                                path.append(node)
+                                node = parent[node.key()]
+                            path.reverse()
+                        
+                        return SimulationResult(
+                            status="SUCCESS",
+                            steps=steps,
+                            final_value=final_value,
+                            path=path,
+                            message=f"Reached accepting state q{config.state} in {steps} steps"
+                        )
+                
+                # Проверяем лимит шагов
+                if steps >= max_steps:
+                    continue
+                
+                # Следующие конфигурации
+                for next_config in step(config):
+                    tape = next_config.tape
+                    key = (next_config.state, tape.cells, tape.head)
+                    if key not in parent:
+                        parent[key] = link
+                        next_frontier.append(next_config)
             
-            for next_config in next_configs:
-                if next_config not in visited:
-                    visited.add(next_config)
-                    queue.append((next_config, path + [next_config], steps + 1))
+            frontier = next_frontier
+            steps += 1
         
         # Не нашли решение
         if configs_explored >= max_configs:
@@ -239,6 +416,64 @@ class TMSimulator:
                 message=f"No accepting configuration found in {max_steps} steps"
             )
 
+    
+    def _simulate_compiled(
+        self,
+        input_value: int,
+        target_value: Optional[int],
+        max_steps: int,
+        max_configs: int,
+        return_path: bool
+    ) -> Optional[SimulationResult]:
+        """
+        simulate для детерминированной TM через _run_deterministic.
+        
+        Ядро не хранит посещённые конфигурации, поэтому цикл TM не
+        обрывает прогон, как в BFS. На SUCCESS и FAILURE это не влияет:
+        повтор конфигурации повторяет и её исход, а FAILURE не зависит от
+        места остановки. Исход TIMEOUT мог бы в BFS оказаться FAILURE
+        (цикл найден раньше лимита) — тогда возвращается None, и simulate
+        выполняет обычный BFS.
+        """
+        outcome, index, value, state = _run_deterministic(
+            self._table,
+            self._accepting,
+            self.tm.initial_state,
+            max(input_value, 0),
+            -1 if target_value is None else target_value,
+            max_steps,
+            max_configs
+        )
+        
+        if outcome == _RUN_ENDED:
+            if index >= max_configs:
+                return None
+            return SimulationResult(
+                status="FAILURE",
+                steps=0,
+                message=f"No accepting configuration found in {max_steps} steps"
+            )
+        
+        # Путь восстанавливается повторным проходом по цепочке
+        path = None
+        if return_path:
+            config = Configuration(
+                state=self.tm.initial_state,
+                tape=Tape(cells='0' * input_value if input_value > 0 else '0', head=0)
+            )
+            path = [config]
+            for _ in range(index):
+                config = self.step(config)[0]
+                path.append(config)
+        
+        return SimulationResult(
+            status="SUCCESS",
+            steps=index,
+            final_value=value,
+            path=path,
+            message=f"Reached accepting state q{state} in {index} steps"
+        )
+
 
 def demo():
     """Демонстрация симулятора"""
@@ -265,7 +500,7 @@ def demo():
     target_val = 4
     
     print(f"Simulating: {input_val} + 1 = ?")
-    result = simulator.simulate(input_val, target_val, max_steps=20)
+    result = simulator.simulate(input_val, target_val, max_steps=20, return_path=True)
     
     print(f"\nStatus: {result.status}")
     print(f"Steps: {result.steps}")
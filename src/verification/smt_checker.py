@@ -218,9 +218,18 @@ class Z3Checker:
                 details=details
             )
         
-        # Проверяем каждую критическую пару
+        # Проверяем каждую критическую пару. Совпадающие строки соединимы
+        # тривиально, а одна и та же пара (в любом порядке) от разных
+        # перекрытий проверяется поиском только один раз
+        joinable_cache: Dict[Tuple[str, str], bool] = {}
         for s, (a, b) in critical_pairs:
-            joinable = self._check_joinable(a, b, prop.rules, prop.max_depth, engine)
+            if a == b:
+                continue
+            key = (a.data, b.data) if a.data <= b.data else (b.data, a.data)
+            joinable = joinable_cache.get(key)
+            if joinable is None:
+                joinable = self._check_joinable(a, b, prop.rules, prop.max_depth, engine)
+                joinable_cache[key] = joinable
             if not joinable:
                 return VerificationResult(
                     property_type=PropertyType.CONFLUENCE,
@@ -274,105 +283,143 @@ class Z3Checker:
         """
         critical_pairs = []
         
+        # Строка -> {правило: результат его первого применения}. Перекрытия
+        # разных пар правил часто совпадают, поэтому применения к каждой
+        # строке считаются один раз. Ключ словаря правил — само правило:
+        # совпадение то же, что при сравнении app[1] == rule
+        first_results: Dict[str, Dict[Rule, String]] = {}
+        
         for i, rule1 in enumerate(rules):
-            for j, rule2 in enumerate(rules):
-                if i >= j:
-                    continue
-                
+            for rule2 in rules[i + 1:]:
                 # Ищем перекрытия паттернов
-                overlaps = self._find_pattern_overlaps(rule1.left, rule2.left, rules)
+                overlaps = self._find_pattern_overlaps(rule1.left, rule2.left)
                 
                 for s in overlaps:
-                    # Применяем оба правила
-                    apps1 = [app for app in engine.all_applications(s) if app[1] == rule1]
-                    apps2 = [app for app in engine.all_applications(s) if app[1] == rule2]
+                    results = first_results.get(s.data)
+                    if results is None:
+                        results = {}
+                        for new_string, rule, _ in engine.all_applications(s):
+                            if rule not in results:
+                                results[rule] = new_string
+                        first_results[s.data] = results
                     
-                    if apps1 and apps2:
-                        a = apps1[0][0]  # новая строка из первого применения
-                        b = apps2[0][0]  # новая строка из второго применения
-                        if a != b:
-                            critical_pairs.append((s, (a, b)))
+                    # Новые строки из первых применений обоих правил
+                    a = results.get(rule1)
+                    b = results.get(rule2)
+                    if a is not None and b is not None and a != b:
+                        critical_pairs.append((s, (a, b)))
         
         return critical_pairs
     
     def _get_engine(self, rules: List[Rule]) -> RewritingEngine:
         """Получить или создать engine с заданными правилами"""
-        rules_key = tuple((str(r.left), str(r.right)) for r in rules)
+        rules_key = tuple((r.left.data, r.right.data) for r in rules)
         if rules_key not in self._engine_cache:
             self._engine_cache[rules_key] = RewritingEngine(rules)
         return self._engine_cache[rules_key]
     
-    def _find_pattern_overlaps(self, p1: String, p2: String, rules: List[Rule]) -> List[String]:
-        """Найти строки, содержащие оба паттерна"""
-        engine = self._get_engine(rules)
-        
-        # Упрощенная версия: создаём короткие тестовые строки
-        test_strings = []
+    def _find_pattern_overlaps(self, p1: String, p2: String) -> List[String]:
+        """
+        Найти строки, в которых вхождения двух паттернов пересекаются.
         
-        # Сами паттерны
-        test_strings.append(p1)
-        test_strings.append(p2)
+        Как в процедуре Кнута–Бендикса: вложения (один паттерн внутри
+        другого) и перекрытия суффикса одного паттерна с префиксом
+        другого. Непересекающиеся вхождения (p1 + p2) не дают критических
+        пар: такие применения коммутируют.
+        """
+        a = p1.data
+        b = p2.data
+        result = []
         
-        # Конкатенации
-        test_strings.append(String(p1.symbols + p2.symbols))
-        test_strings.append(String(p2.symbols + p1.symbols))
+        # Вложения
+        if b in a:
+            result.append(p1)
+        if a != b and a in b:
+            result.append(p2)
         
-        # Фильтруем: оставляем только те, где оба паттерна встречаются
-        result = []
-        for s in test_strings:
-            if (engine.find_positions(s, p1) and 
-                engine.find_positions(s, p2)):
-                result.append(s)
+        # Собственные перекрытия: суффикс a = префикс b и наоборот
+        for k in range(1, min(len(a), len(b))):
+            if a.endswith(b[:k]):
+                result.append(String.from_str(a + b[k:]))
+            if a != b and b.endswith(a[:k]):
+                result.append(String.from_str(b + a[k:]))
         
-        return result
+        return list(dict.fromkeys(result))
     
     def _check_joinable(self, a: String, b: String, rules: List[Rule], max_depth: int, engine: RewritingEngine) -> bool:
         """
         Проверить, соединимы ли a и b: ∃c: a →* c и b →* c.
         """
-        # Вычисляем достижимые множества
-        reach_a_dict = engine.bounded_reach(a, depth=max_depth, width=1000)
-        reach_b_dict = engine.bounded_reach(b, depth=max_depth, width=1000)
+        # Двунаправленный поиск: обходы из a и из b идут попеременно (шаг
+        # делает сторона с меньшим числом найденных строк), каждая новая
+        # строка сразу проверяется по найденным другой стороной. Общая
+        # строка обнаруживается, как только её нашли обе стороны, — полное
+        # множество строится не более чем для одной стороны.
+        # Множества хранят str (String.data): хеширование и сравнение в C
+        reach_a = engine.iter_reach(a, max_depth, 1000)
+        reach_b = engine.iter_reach(b, max_depth, 1000)
+        seen_a: Set[str] = set()
+        seen_b: Set[str] = set()
         
-        # Собираем все достижимые строки
-        reach_a = set()
-        for level_strings in reach_a_dict.values():
-            reach_a.update(level_strings)
-        
-        reach_b = set()
-        for level_strings in reach_b_dict.values():
-            reach_b.update(level_strings)
+        while True:
+            if len(seen_a) <= len(seen_b):
+                reach, seen, other = reach_a, seen_a, seen_b
+                rest, done = reach_b, seen_a
+            else:
+                reach, seen, other = reach_b, seen_b, seen_a
+                rest, done = reach_a, seen_b
+            
+            item = next(reach, None)
+            if item is None:
+                break
+            
+            key = item[1].data
+            if key in other:
+                return True
+            seen.add(key)
         
-        # Ищем пересечение
-        intersection = reach_a.intersection(reach_b)
-        return len(intersection) > 0
+        # Одна сторона исчерпана, её множество полное: оставшаяся
+        # досматривается потоком, без накопления собственного множества
+        return any(string.data in done for _, string in rest)
     
     def _check_termination(self, s: String, rules: List[Rule], max_steps: int, engine: RewritingEngine) -> bool:
         """
         Проверить, что переписывание терминируется за max_steps шагов.
         """
-        visited = set()
-        queue = [s]
+        # Обход в ширину по уровням (порядок тот же, что у очереди FIFO):
+        # применения ко всему уровню ищутся одним пакетом движка, а не
+        # по строке. Строка помечается посещённой при постановке в
+        # уровень, ключ visited — String.data
+        visited = {s.data}
+        frontier = [s]
         steps = 0
         
-        while queue and steps < max_steps:
-            current = queue.pop(0)
-            
-            if current in visited:
-                continue
-            
-            visited.add(current)
-            steps += 1
-            
-            # Получаем следующие состояния
-            apps = engine.all_applications(current)
-            nexts = [app[0] for app in apps if app[1] in rules]
+        # Правила движка, входящие в rules (проверка app[1] in rules
+        # один раз на правило, а не на каждое применение)
+        allowed = {id(rule) for rule in engine.rules if rule in rules}
+        
+        while frontier and steps < max_steps:
+            # Не больше строк, чем осталось шагов
+            batch = frontier[:max_steps - steps]
+            next_frontier = []
             
-            if not nexts:
-                # Нормальная форма достигнута
-                return True
+            for apps in engine.all_applications_batch(batch):
+                steps += 1
+                
+                # Получаем следующие состояния
+                nexts = [app[0] for app in apps if id(app[1]) in allowed]
+                
+                if not nexts:
+                    # Нормальная форма достигнута
+                    return True
+                
+                for string in nexts:
+                    key = string.data
+                    if key not in visited:
+                        visited.add(key)
+                        next_frontier.append(string)
             
-            queue.extend(nexts)
+            frontier = next_frontier
         
         # Превысили max_steps - считаем нетерминирующим
         return steps < max_steps
@@ -25,6 +25,20 @@ def test_string_from_str():
     assert str(s) == "00|00"
 
 
+def test_string_text():
+    """Тест строкового представления и совместимости с Symbol"""
+    s = String.from_str("0|00")
+    assert s.data == "0|00"
+    assert s.symbols == (Symbol('0'), Symbol('|'), Symbol('0'), Symbol('0'))
+    assert s == String(s.symbols)
+    
+    try:
+        String((Symbol('M1'),))
+        assert False, "многосимвольный Symbol должен отвергаться"
+    except ValueError:
+        pass
+
+
 def test_string_blocks():
     """Тест извлечения блоков"""
     s = String.from_str("00|000|0")
@@ -32,6 +46,16 @@ def test_string_blocks():
     assert blocks == [2, 3, 1]
 
 
+def test_string_bits():
+    """Тест упаковки строки в биты и обратно"""
+    for text in ["", "0", "|", "00|000|0", "|" * 9, "0|" * 13]:
+        s = String.from_str(text)
+        length, packed = s.to_bits()
+        assert length == len(text)
+        assert len(packed) == (len(text) + 7) // 8
+        assert String.from_bits(length, packed) is s
+
+
 def test_rule_creation():
     """Тест создания правил"""
     rule = Rule(
@@ -83,6 +107,27 @@ def test_all_applications():
     assert "00|0" in results
 
 
+def test_all_applications_batch():
+    """Тест пакетного поиска применений (AC-автомат против str.find по правилам)"""
+    lefts = ["0", "|", "00", "0|", "|0", "||", "000", "0|0"]
+    rules = [Rule(left=String.from_str(l), right=String.from_str("|")) for l in lefts]
+    engine = RewritingEngine(rules)
+    
+    strings = [String.from_str(s) for s in ["0|00|0", "", "|||", "0|00|0"]]
+    batch = engine.all_applications_batch(strings)
+    
+    # Эталон — поиск str.find по каждому правилу, без AC-автомата
+    expected = [
+        [
+            (engine.apply_rule(s, rule, pos), rule, pos)
+            for rule in rules
+            for pos in engine.find_positions(s, rule.left)
+        ]
+        for s in strings
+    ]
+    assert batch == expected
+
+
 def test_reachable():
     """Тест проверки достижимости"""
     rule = Rule(
@@ -137,6 +182,20 @@ def test_nondeterminism():
     assert "|0" in results
 
 
+def test_point_copy_and_pickle():
+    """Тест копирования и сериализации неизменяемой точки"""
+    import copy
+    import pickle
+    from src.math_lifts.geometry import Point
+    
+    point = Point((1.0, 2.5), String.from_str("0|0"))
+    
+    for clone in (copy.copy(point), copy.deepcopy(point), pickle.loads(pickle.dumps(point))):
+        assert clone == point
+        assert clone.coordinates == (1.0, 2.5)
+        assert str(clone.label) == "0|0"
+
+
 if __name__ == "__main__":
     # Запуск тестов вручную
     print("Запуск тестов...")
@@ -144,14 +203,17 @@ if __name__ == "__main__":
     tests = [
         test_symbol_creation,
         test_string_from_str,
+        test_string_text,
         test_string_blocks,
         test_rule_creation,
         test_find_positions,
         test_apply_rule,
         test_all_applications,
+        test_all_applications_batch,
         test_reachable,
         test_bounded_reach,
-        test_nondeterminism
+        test_nondeterminism,
+        test_point_copy_and_pickle
     ]
     
     passed = 0